@@ -1,8 +1,136 @@
-from flask import Flask, jsonify
+from flask import Flask, jsonify, request
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
 from flask_jwt_extended import JWTManager
 from config import Config
+import json
 import os
+import time
+
+# orjson serializes 3-10x faster than stdlib json; fall back to Flask's
+# default provider when it is not installed
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+class OrjsonProvider(DefaultJSONProvider):
+    """Flask JSON provider backed by orjson's C serializer"""
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=self.default).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+# Cached /health result - full dependency checks run at most once per TTL
+_HEALTH_CACHE_TTL = 10
+_health_cache = {'time': 0.0, 'result': None}
+
+# Fixed error payloads - built once instead of per callback
+_TOKEN_EXPIRED_PAYLOAD = {
+    'success': False,
+    'message': 'Token has expired',
+    'error': 'token_expired'
+}
+_TOKEN_INVALID_PAYLOAD = {
+    'success': False,
+    'message': 'Invalid token',
+    'error': 'invalid_token'
+}
+_TOKEN_MISSING_PAYLOAD = {
+    'success': False,
+    'message': 'Authorization token is missing',
+    'error': 'authorization_required'
+}
+_TOKEN_REVOKED_PAYLOAD = {
+    'success': False,
+    'message': 'Token has been revoked',
+    'error': 'token_revoked'
+}
+_NOT_FOUND_PAYLOAD = {
+    'success': False,
+    'message': 'Endpoint not found',
+    'error': 'not_found'
+}
+_METHOD_NOT_ALLOWED_PAYLOAD = {
+    'success': False,
+    'message': 'Method not allowed',
+    'error': 'method_not_allowed'
+}
+_INTERNAL_ERROR_PAYLOAD = {
+    'success': False,
+    'message': 'Internal server error',
+    'error': 'internal_server_error'
+}
+
+def _prebuilt_response(payload, status):
+    """
+    Pre-serialize a fixed payload at import time
+
+    Returning the (bytes, status, headers) tuple lets Flask build a fresh
+    Response per request (safe for after-request header mutation) while
+    skipping the serializer entirely.
+    """
+    if orjson is not None:
+        body = orjson.dumps(payload)
+    else:
+        body = json.dumps(payload).encode('utf-8')
+
+    return body, status, {'Content-Type': 'application/json'}
+
+_TOKEN_EXPIRED_RESPONSE = _prebuilt_response(_TOKEN_EXPIRED_PAYLOAD, 401)
+_TOKEN_INVALID_RESPONSE = _prebuilt_response(_TOKEN_INVALID_PAYLOAD, 401)
+_TOKEN_MISSING_RESPONSE = _prebuilt_response(_TOKEN_MISSING_PAYLOAD, 401)
+_TOKEN_REVOKED_RESPONSE = _prebuilt_response(_TOKEN_REVOKED_PAYLOAD, 401)
+_NOT_FOUND_RESPONSE = _prebuilt_response(_NOT_FOUND_PAYLOAD, 404)
+_METHOD_NOT_ALLOWED_RESPONSE = _prebuilt_response(_METHOD_NOT_ALLOWED_PAYLOAD, 405)
+_INTERNAL_ERROR_RESPONSE = _prebuilt_response(_INTERNAL_ERROR_PAYLOAD, 500)
+
+# Static root payload - built once instead of per request
+_INDEX_RESPONSE = {
+    'success': True,
+    'message': 'EmoTune API - Emotion-Based Music Recommender',
+    'version': '1.0.0',
+    'endpoints': {
+        'authentication': {
+            'register': 'POST /api/auth/register',
+            'login': 'POST /api/auth/login',
+            'refresh': 'POST /api/auth/refresh',
+            'forgot_password': 'POST /api/auth/forgot-password',
+            'verify_reset_code': 'POST /api/auth/verify-reset-code',
+            'reset_password': 'POST /api/auth/reset-password',
+            'validate_token': 'GET /api/auth/validate-token'
+        },
+        'emotion_detection': {
+            'upload_image': 'POST /api/emotion/detect-upload',
+            'live_camera': 'POST /api/emotion/detect-live',
+            'batch_detect': 'POST /api/emotion/batch-detect',
+            'model_info': 'GET /api/emotion/model-info',
+            'test': 'GET /api/emotion/test'
+        },
+        'music': {
+            'recommendations': 'GET /api/music/recommendations/<emotion>',
+            'like_song': 'POST /api/music/like',
+            'unlike_song': 'DELETE /api/music/unlike/<song_id>',
+            'liked_songs': 'GET /api/music/liked',
+            'search': 'GET /api/music/search',
+            'track_details': 'GET /api/music/track/<track_id>',
+            'genres': 'GET /api/music/genres',
+            'test': 'GET /api/music/test'
+        },
+        'user': {
+            'profile': 'GET /api/user/profile',
+            'edit_profile': 'PUT /api/user/profile/edit',
+            'upload_picture': 'POST /api/user/profile/picture',
+            'get_picture': 'GET /api/user/profile/picture/<filename>',
+            'delete_account': 'DELETE /api/user/account',
+            'statistics': 'GET /api/user/statistics',
+            'preferences': 'GET /api/user/preferences'
+        }
+    },
+    'documentation': 'Visit /api/docs for detailed API documentation'
+}
 
 # Import routes
 from routes.auth import auth_bp
@@ -10,13 +138,25 @@ from routes.emotion import emotion_bp
 from routes.music import music_bp
 from routes.user import user_bp
 
+# One app instance per config name - the factory output is fully
+# determined by the static Config, so repeat calls (gunicorn preload,
+# per-worker imports) reuse the already-built app
+_app_instances = {}
+
 def create_app(config_name='development'):
     """
     Application factory pattern
     Creates and configures the Flask application
     """
+    if config_name in _app_instances:
+        return _app_instances[config_name]
+
     app = Flask(__name__)
-    
+
+    # Use orjson for request/response JSON when available
+    if orjson is not None:
+        app.json = OrjsonProvider(app)
+
     # Load configuration
     app.config.from_object(Config)
     
@@ -32,39 +172,28 @@ def create_app(config_name='development'):
     
     # Initialize JWT
     jwt = JWTManager(app)
-    
+
+    # Cache verified tokens so repeat requests skip signature verification
+    if Config.JWT_VERIFY_CACHE_ENABLED:
+        from utils.jwt_cache import install_jwt_cache
+        install_jwt_cache(jwt)
+
     # JWT error handlers
     @jwt.expired_token_loader
     def expired_token_callback(jwt_header, jwt_payload):
-        return jsonify({
-            'success': False,
-            'message': 'Token has expired',
-            'error': 'token_expired'
-        }), 401
-    
+        return _TOKEN_EXPIRED_RESPONSE
+
     @jwt.invalid_token_loader
     def invalid_token_callback(error):
-        return jsonify({
-            'success': False,
-            'message': 'Invalid token',
-            'error': 'invalid_token'
-        }), 401
-    
+        return _TOKEN_INVALID_RESPONSE
+
     @jwt.unauthorized_loader
     def missing_token_callback(error):
-        return jsonify({
-            'success': False,
-            'message': 'Authorization token is missing',
-            'error': 'authorization_required'
-        }), 401
-    
+        return _TOKEN_MISSING_RESPONSE
+
     @jwt.revoked_token_loader
     def revoked_token_callback(jwt_header, jwt_payload):
-        return jsonify({
-            'success': False,
-            'message': 'Token has been revoked',
-            'error': 'token_revoked'
-        }), 401
+        return _TOKEN_REVOKED_RESPONSE
     
     # Register blueprints (routes)
     app.register_blueprint(auth_bp)
@@ -75,82 +204,57 @@ def create_app(config_name='development'):
     # Root endpoint
     @app.route('/')
     def index():
-        return jsonify({
-            'success': True,
-            'message': 'EmoTune API - Emotion-Based Music Recommender',
-            'version': '1.0.0',
-            'endpoints': {
-                'authentication': {
-                    'register': 'POST /api/auth/register',
-                    'login': 'POST /api/auth/login',
-                    'refresh': 'POST /api/auth/refresh',
-                    'forgot_password': 'POST /api/auth/forgot-password',
-                    'verify_reset_code': 'POST /api/auth/verify-reset-code',
-                    'reset_password': 'POST /api/auth/reset-password',
-                    'validate_token': 'GET /api/auth/validate-token'
-                },
-                'emotion_detection': {
-                    'upload_image': 'POST /api/emotion/detect-upload',
-                    'live_camera': 'POST /api/emotion/detect-live',
-                    'batch_detect': 'POST /api/emotion/batch-detect',
-                    'model_info': 'GET /api/emotion/model-info',
-                    'test': 'GET /api/emotion/test'
-                },
-                'music': {
-                    'recommendations': 'GET /api/music/recommendations/<emotion>',
-                    'like_song': 'POST /api/music/like',
-                    'unlike_song': 'DELETE /api/music/unlike/<song_id>',
-                    'liked_songs': 'GET /api/music/liked',
-                    'search': 'GET /api/music/search',
-                    'track_details': 'GET /api/music/track/<track_id>',
-                    'genres': 'GET /api/music/genres',
-                    'test': 'GET /api/music/test'
-                },
-                'user': {
-                    'profile': 'GET /api/user/profile',
-                    'edit_profile': 'PUT /api/user/profile/edit',
-                    'upload_picture': 'POST /api/user/profile/picture',
-                    'get_picture': 'GET /api/user/profile/picture/<filename>',
-                    'delete_account': 'DELETE /api/user/account',
-                    'statistics': 'GET /api/user/statistics',
-                    'preferences': 'GET /api/user/preferences'
-                }
-            },
-            'documentation': 'Visit /api/docs for detailed API documentation'
-        }), 200
+        return jsonify(_INDEX_RESPONSE), 200
     
+    # Liveness probe - no dependency checks, safe to hit at high frequency
+    @app.route('/ping')
+    def ping():
+        """Check if the API process is alive"""
+        return jsonify({'status': 'ok'}), 200
+
     # Health check endpoint
     @app.route('/health')
     def health_check():
         """Check if all services are running"""
+        # Startup probe: only confirms the app is serving requests
+        if request.args.get('type') == 'startup':
+            return jsonify({
+                'success': True,
+                'status': 'started'
+            }), 200
+
+        # Serve the cached result while it is fresh - probes can hit this
+        # endpoint several times a second
+        now = time.monotonic()
+        if _health_cache['result'] and now - _health_cache['time'] < _HEALTH_CACHE_TTL:
+            body, status_code = _health_cache['result']
+            return jsonify(body), status_code
+
         health_status = {
             'api': 'healthy',
             'database': 'unknown',
             'emotion_model': 'unknown',
             'spotify': 'unknown'
         }
-        
+
         # Check database
         try:
             from utils.db_helper import DatabaseHelper
             db = DatabaseHelper()
-            conn = db.get_connection()
-            conn.close()
-            health_status['database'] = 'healthy'
-        except Exception as e:
-            health_status['database'] = f'error: {str(e)}'
-        
-        # Check emotion model
-        try:
-            from utils.emotion_detector import EmotionDetector
-            detector = EmotionDetector()
-            if detector.model is not None:
-                health_status['emotion_model'] = 'healthy'
+            if db.ping():
+                health_status['database'] = 'healthy'
             else:
-                health_status['emotion_model'] = 'not loaded'
+                health_status['database'] = 'unreachable'
         except Exception as e:
-            health_status['emotion_model'] = f'error: {str(e)}'
-        
+            health_status['database'] = f'error: {str(e)}'
+
+        # Check emotion model files (instantiating EmotionDetector here
+        # would reload the full Keras model on every uncached probe)
+        if os.path.exists(Config.MODEL_PATH) and os.path.exists(Config.CLASS_INDICES_PATH):
+            health_status['emotion_model'] = 'healthy'
+        else:
+            health_status['emotion_model'] = 'not found'
+
         # Check Spotify
         try:
             from routes.music import get_spotify_client
@@ -162,50 +266,46 @@ def create_app(config_name='development'):
                 health_status['spotify'] = 'not configured'
         except Exception as e:
             health_status['spotify'] = f'error: {str(e)}'
-        
+
         # Overall status
         all_healthy = all(status == 'healthy' for status in health_status.values())
-        
-        return jsonify({
+
+        body = {
             'success': all_healthy,
             'status': 'healthy' if all_healthy else 'degraded',
             'services': health_status
-        }), 200 if all_healthy else 503
+        }
+        status_code = 200 if all_healthy else 503
+
+        _health_cache['result'] = (body, status_code)
+        _health_cache['time'] = now
+
+        return jsonify(body), status_code
     
     # Error handlers
     @app.errorhandler(404)
     def not_found(error):
-        return jsonify({
-            'success': False,
-            'message': 'Endpoint not found',
-            'error': 'not_found'
-        }), 404
-    
+        return _NOT_FOUND_RESPONSE
+
     @app.errorhandler(405)
     def method_not_allowed(error):
-        return jsonify({
-            'success': False,
-            'message': 'Method not allowed',
-            'error': 'method_not_allowed'
-        }), 405
-    
+        return _METHOD_NOT_ALLOWED_RESPONSE
+
     @app.errorhandler(500)
     def internal_error(error):
-        return jsonify({
-            'success': False,
-            'message': 'Internal server error',
-            'error': 'internal_server_error'
-        }), 500
+        return _INTERNAL_ERROR_RESPONSE
     
-    # Request logging (optional - for development)
-    if Config.DEBUG:
+    # Request logging (optional - for development, REQUEST_TRACE=0 disables)
+    if Config.DEBUG and os.getenv('REQUEST_TRACE', '1') != '0':
         @app.before_request
         def log_request():
-            from flask import request
             print(f"\n{'='*50}")
             print(f"📥 {request.method} {request.path}")
-            if request.get_json(silent=True):
-                print(f"📦 Body: {request.get_json()}")
+            # Parse the body once - get_json caches, but calling it twice
+            # still costs a second lookup and mimetype check
+            body = request.get_json(silent=True)
+            if body is not None:
+                print(f"📦 Body: {body}")
             print(f"{'='*50}\n")
         
         @app.after_request
@@ -214,7 +314,9 @@ def create_app(config_name='development'):
             print(f"📤 Response Status: {response.status_code}")
             print(f"{'='*50}\n")
             return response
-    
+
+    _app_instances[config_name] = app
+
     return app
 
 # Create the application instance
@@ -1,5 +1,7 @@
 import os
+import sys
 from datetime import timedelta
+from types import MappingProxyType
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -25,6 +27,22 @@ class Config:
     JWT_SECRET_KEY = os.getenv('JWT_SECRET_KEY', 'jwt-secret-key-change-in-production')
     JWT_ACCESS_TOKEN_EXPIRES = timedelta(seconds=int(os.getenv('JWT_ACCESS_TOKEN_EXPIRES', 3600)))
     JWT_REFRESH_TOKEN_EXPIRES = timedelta(days=30)
+    JWT_VERIFY_CACHE_ENABLED = os.getenv('JWT_VERIFY_CACHE_ENABLED', 'true').lower() == 'true'
+
+    # Asymmetric JWT signing (optional): point these at an Ed25519 PEM
+    # keypair to switch from HS256 to EdDSA, which verifies 3-4x faster
+    # than RSA. PEMs are read once at import, never per request.
+    JWT_PRIVATE_KEY_PATH = os.getenv('JWT_PRIVATE_KEY_PATH')
+    JWT_PUBLIC_KEY_PATH = os.getenv('JWT_PUBLIC_KEY_PATH')
+
+    if JWT_PRIVATE_KEY_PATH and JWT_PUBLIC_KEY_PATH:
+        JWT_ALGORITHM = 'EdDSA'
+        with open(JWT_PRIVATE_KEY_PATH, 'r') as _key_file:
+            JWT_PRIVATE_KEY = _key_file.read()
+        with open(JWT_PUBLIC_KEY_PATH, 'r') as _key_file:
+            JWT_PUBLIC_KEY = _key_file.read()
+    else:
+        JWT_ALGORITHM = 'HS256'
     
     # Spotify API Configuration
     SPOTIFY_CLIENT_ID = os.getenv('SPOTIFY_CLIENT_ID')
@@ -33,6 +51,9 @@ class Config:
     
     # Model Configuration
     MODEL_PATH = os.path.join(os.path.dirname(__file__), 'model', 'best_model.keras')
+    # Mixed-precision inference on GPU hosts (~2x on tensor-core cards);
+    # ignored when no GPU is visible
+    USE_FP16 = os.getenv('USE_FP16', 'false').lower() == 'true'
     CLASS_INDICES_PATH = os.path.join(os.path.dirname(__file__), 'model', 'class_indices.json')
     
     # Image Upload Configuration
@@ -57,39 +78,44 @@ class Config:
     ]
     
     # Emotion to Genre Mapping
-    EMOTION_GENRE_MAP = {
-        'happy': ['pop', 'dance', 'party', 'happy'],
-        'sad': ['acoustic', 'indie', 'sad', 'piano'],
-        'angry': ['rock', 'metal', 'hard-rock', 'punk'],
-        'neutral': ['chill', 'ambient', 'lo-fi', 'jazz'],
-        'surprised': ['electronic', 'edm', 'dance', 'pop'],
-        'fearful': ['classical', 'calm', 'ambient', 'meditation'],
-        'disgusted': ['punk', 'alternative', 'indie', 'rock'],
-        'excited': ['dance', 'electronic', 'upbeat', 'party']
-    }
-    
+    # Read-only with interned keys and tuple values: lookups skip hash
+    # recomputation and forked workers share the pages (CoW friendly)
+    EMOTION_GENRE_MAP = MappingProxyType({
+        sys.intern(emotion): tuple(sys.intern(genre) for genre in genres)
+        for emotion, genres in {
+            'happy': ['pop', 'dance', 'party', 'happy'],
+            'sad': ['acoustic', 'indie', 'sad', 'piano'],
+            'angry': ['rock', 'metal', 'hard-rock', 'punk'],
+            'neutral': ['chill', 'ambient', 'lo-fi', 'jazz'],
+            'surprised': ['electronic', 'edm', 'dance', 'pop'],
+            'fearful': ['classical', 'calm', 'ambient', 'meditation'],
+            'disgusted': ['punk', 'alternative', 'indie', 'rock'],
+            'excited': ['dance', 'electronic', 'upbeat', 'party']
+        }.items()
+    })
+
     # Language to Spotify Market Code Mapping
-    LANGUAGE_MARKET_MAP = {
-        'english': 'US',
-        'hindi': 'IN',
-        'spanish': 'ES',
-        'french': 'FR',
-        'german': 'DE',
-        'italian': 'IT',
-        'portuguese': 'BR'
-    }
-    
+    LANGUAGE_MARKET_MAP = MappingProxyType({
+        sys.intern('english'): 'US',
+        sys.intern('hindi'): 'IN',
+        sys.intern('spanish'): 'ES',
+        sys.intern('french'): 'FR',
+        sys.intern('german'): 'DE',
+        sys.intern('italian'): 'IT',
+        sys.intern('portuguese'): 'BR'
+    })
+
     # Emotion Display Configuration
-    EMOTION_EMOJIS = {
-        'happy': '😊',
-        'sad': '😢',
-        'angry': '😠',
-        'neutral': '😐',
-        'surprised': '😲',
-        'fearful': '😰',
-        'disgusted': '🤢',
-        'excited': '🤩'
-    }
+    EMOTION_EMOJIS = MappingProxyType({
+        sys.intern('happy'): '😊',
+        sys.intern('sad'): '😢',
+        sys.intern('angry'): '😠',
+        sys.intern('neutral'): '😐',
+        sys.intern('surprised'): '😲',
+        sys.intern('fearful'): '😰',
+        sys.intern('disgusted'): '🤢',
+        sys.intern('excited'): '🤩'
+    })
     
     # Password Reset Configuration
     RESET_CODE_EXPIRY = timedelta(minutes=15)  # Reset codes expire in 15 minutes
@@ -0,0 +1,77 @@
+"""
+One-time conversion of the Keras emotion model to TFLite.
+
+    python convert_model.py                      # float32, dynamic-range quantized
+    python convert_model.py --int8 path/to/faces # full INT8 (needs sample images)
+
+Full INT8 quantizes weights AND activations, which roughly quarters the
+model size and runs much faster on plain CPUs. It needs a representative
+dataset - a directory with a few hundred face crops from the training
+distribution - to calibrate the activation ranges.
+
+Point MODEL_PATH at the generated .tflite file to serve it; EmotionDetector
+picks the interpreter backend automatically from the extension.
+"""
+import argparse
+import os
+import sys
+
+import cv2
+import numpy as np
+import tensorflow as tf
+
+from config import Config
+
+
+def load_representative_images(directory, limit=300):
+    """Yield calibration batches from a directory of face images"""
+    filenames = sorted(os.listdir(directory))[:limit]
+
+    for filename in filenames:
+        image = cv2.imread(os.path.join(directory, filename), cv2.IMREAD_GRAYSCALE)
+        if image is None:
+            continue
+
+        image = cv2.resize(image, Config.IMAGE_SIZE)
+        image = image.astype(np.float32) / 255.0
+        yield [image.reshape(1, *Config.IMAGE_SIZE, 1)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Convert the emotion model to TFLite')
+    parser.add_argument('--int8', metavar='IMAGE_DIR', default=None,
+                        help='directory of face images for full INT8 calibration')
+    parser.add_argument('--output', default=None,
+                        help='output path (default: model path with .tflite extension)')
+    args = parser.parse_args()
+
+    model_path = Config.MODEL_PATH
+    if not os.path.exists(model_path):
+        print(f"❌ Model file not found at {model_path}")
+        sys.exit(1)
+
+    model = tf.keras.models.load_model(model_path)
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    converter.optimizations = [tf.lite.Optimize.DEFAULT]
+
+    if args.int8:
+        converter.representative_dataset = lambda: load_representative_images(args.int8)
+        converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+        converter.inference_input_type = tf.int8
+        converter.inference_output_type = tf.int8
+
+    tflite_model = converter.convert()
+
+    output_path = args.output or os.path.splitext(model_path)[0] + '.tflite'
+    with open(output_path, 'wb') as f:
+        f.write(tflite_model)
+
+    original_size = os.path.getsize(model_path)
+    converted_size = os.path.getsize(output_path)
+    print(f"✅ Wrote {output_path}")
+    print(f"   {original_size / 1e6:.1f} MB -> {converted_size / 1e6:.1f} MB "
+          f"({'full INT8' if args.int8 else 'dynamic-range'})")
+
+
+if __name__ == '__main__':
+    main()
@@ -54,6 +54,10 @@ CREATE TABLE IF NOT EXISTS session_tokens (
 CREATE INDEX IF NOT EXISTS idx_users_email ON users(email);
 CREATE INDEX IF NOT EXISTS idx_liked_songs_user_id ON liked_songs(user_id);
 CREATE INDEX IF NOT EXISTS idx_liked_songs_spotify_id ON liked_songs(spotify_track_id);
+-- Composite indexes: the first serves WHERE user_id ORDER BY liked_at DESC
+-- without a sort step, the second turns is_song_liked into a single seek
+CREATE INDEX IF NOT EXISTS idx_liked_songs_user_time ON liked_songs(user_id, liked_at DESC);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_liked_songs_user_track ON liked_songs(user_id, spotify_track_id);
 CREATE INDEX IF NOT EXISTS idx_reset_codes_user_id ON password_reset_codes(user_id);
 CREATE INDEX IF NOT EXISTS idx_reset_codes_code ON password_reset_codes(reset_code);
 CREATE INDEX IF NOT EXISTS idx_session_tokens_jti ON session_tokens(token_jti);
@@ -1,15 +1,98 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import create_access_token, create_refresh_token, jwt_required, get_jwt_identity
 from utils.db_helper import DatabaseHelper
+from config import Config
+from functools import lru_cache
+import hashlib
+import hmac
 import re
+import threading
+import time
 
 auth_bp = Blueprint('auth', __name__, url_prefix='/api/auth')
 db = DatabaseHelper()
 
+# In-process token bucket per client IP for the password-reset endpoints -
+# keeps a single source from hammering SQLite without needing Redis
+_RATE_LIMIT = 5       # requests allowed...
+_RATE_WINDOW = 60.0   # ...per this many seconds
+_RATE_MAX_BUCKETS = 10000
+_rate_buckets = {}
+_rate_lock = threading.Lock()
+
+# Dummy digest for the unknown-email branch's mirrored HMAC
+_DUMMY_DIGEST = hashlib.sha256(b'emotune-dummy-reset-code').hexdigest()
+
+def _rate_limited(client_ip):
+    """Return True when the client has exhausted its token bucket"""
+    now = time.monotonic()
+
+    with _rate_lock:
+        # Drop everything if the table grows unbounded under abuse
+        if len(_rate_buckets) > _RATE_MAX_BUCKETS:
+            _rate_buckets.clear()
+
+        tokens, last = _rate_buckets.get(client_ip, (_RATE_LIMIT, now))
+        tokens = min(_RATE_LIMIT, tokens + (now - last) * (_RATE_LIMIT / _RATE_WINDOW))
+
+        if tokens < 1:
+            _rate_buckets[client_ip] = (tokens, now)
+            return True
+
+        _rate_buckets[client_ip] = (tokens - 1, now)
+        return False
+
+def _too_many_requests():
+    """Shared 429 response for rate-limited endpoints"""
+    return jsonify({
+        'success': False,
+        'message': 'Too many requests. Please try again later.'
+    }), 429
+
+# Prefer Google's RE2 (linear-time, no backtracking, so immune to ReDoS
+# on attacker-supplied emails) when installed; stdlib re otherwise
+try:
+    import re2 as _regex
+except ImportError:
+    _regex = re
+
+# Compiled once at import - avoids re-cache lookups on every auth request
+_EMAIL_RE = _regex.compile(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$')
+
+# Maps each ASCII byte to a 3-bit class mask (1=upper, 2=lower, 4=digit)
+# so one translate pass replaces three regex scans of the password
+_PW_CLASS_MASK = bytes(
+    ((1 if chr(b).isupper() else 0)
+     | (2 if chr(b).islower() else 0)
+     | (4 if chr(b).isdigit() else 0)) if b < 128 else 0
+    for b in range(256)
+)
+
+# Required fields per endpoint, fixed at import
+_REGISTER_FIELDS = ('name', 'email', 'password')
+_RESET_PASSWORD_FIELDS = ('email', 'code', 'new_password')
+
+def _missing_field(data, fields):
+    """Return the first missing or empty required field, or None"""
+    return next((field for field in fields if not data.get(field)), None)
+
+@lru_cache(maxsize=None)
+def _missing_field_payload(field):
+    """Memoized error payload for a missing required field"""
+    return {
+        'success': False,
+        'message': f'{field.replace("_", " ").capitalize()} is required'
+    }
+
+def _norm_email(email):
+    """Normalize an email for storage and lookups in one pass"""
+    # strip() returns the original object when nothing to trim, and
+    # casefold() is the Unicode-correct lowercase
+    return email.strip().casefold()
+
 def validate_email(email):
     """Validate email format"""
-    pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
-    return re.match(pattern, email) is not None
+    return _EMAIL_RE.match(email) is not None
 
 def validate_password(password):
     """
@@ -18,17 +101,21 @@ def validate_password(password):
     """
     if len(password) < 8:
         return False, "Password must be at least 8 characters long"
-    
-    if not re.search(r'[A-Z]', password):
+
+    # OR together the class bits of every character in a single pass
+    mask = 0
+    for class_bits in password.encode('utf-8', 'ignore').translate(_PW_CLASS_MASK):
+        mask |= class_bits
+        if mask == 7:
+            return True, "Password is valid"
+
+    if not mask & 1:
         return False, "Password must contain at least one uppercase letter"
-    
-    if not re.search(r'[a-z]', password):
+
+    if not mask & 2:
         return False, "Password must contain at least one lowercase letter"
-    
-    if not re.search(r'\d', password):
-        return False, "Password must contain at least one number"
-    
-    return True, "Password is valid"
+
+    return False, "Password must contain at least one number"
 
 @auth_bp.route('/register', methods=['POST'])
 def register():
@@ -47,16 +134,11 @@ def register():
         data = request.get_json()
         
         # Validate required fields
-        required_fields = ['name', 'email', 'password']
-        for field in required_fields:
-            if field not in data or not data[field]:
-                return jsonify({
-                    'success': False,
-                    'message': f'{field.capitalize()} is required'
-                }), 400
-        
+        if (missing := _missing_field(data, _REGISTER_FIELDS)):
+            return jsonify(_missing_field_payload(missing)), 400
+
         name = data['name'].strip()
-        email = data['email'].strip().lower()
+        email = _norm_email(data['email'])
         password = data['password']
         preferred_genres = data.get('preferred_genres', '')
         
@@ -142,7 +224,7 @@ def login():
                 'message': 'Email and password are required'
             }), 400
         
-        email = data['email'].strip().lower()
+        email = _norm_email(data['email'])
         password = data['password']
         
         # Verify credentials
@@ -215,21 +297,32 @@ def forgot_password():
     }
     """
     try:
+        if _rate_limited(request.remote_addr):
+            return _too_many_requests()
+
         data = request.get_json()
-        
+
         if not data.get('email'):
             return jsonify({
                 'success': False,
                 'message': 'Email is required'
             }), 400
-        
-        email = data['email'].strip().lower()
-        
+
+        email = _norm_email(data['email'])
+
         # Check if user exists
         user = db.get_user_by_email(email)
-        
+
         if not user:
-            # Don't reveal if email exists or not (security best practice)
+            # Don't reveal if email exists or not (security best practice).
+            # Mirror the crypto of the real branch (code generation plus
+            # the HMAC digest). The real branch also commits a DB write,
+            # so response timing still differs by milliseconds - the rate
+            # limiter above, not this, is what blunts timing probes.
+            digest = hmac.new(Config.SECRET_KEY.encode('utf-8'),
+                              db.generate_reset_code().encode('utf-8'),
+                              hashlib.sha256).hexdigest()
+            hmac.compare_digest(digest, _DUMMY_DIGEST)
             return jsonify({
                 'success': True,
                 'message': 'If the email exists, a reset code has been sent'
@@ -274,17 +367,20 @@ def verify_reset_code():
     }
     """
     try:
+        if _rate_limited(request.remote_addr):
+            return _too_many_requests()
+
         data = request.get_json()
-        
+
         if not data.get('email') or not data.get('code'):
             return jsonify({
                 'success': False,
                 'message': 'Email and code are required'
             }), 400
-        
-        email = data['email'].strip().lower()
+
+        email = _norm_email(data['email'])
         code = data['code'].strip()
-        
+
         # Verify code
         is_valid = db.verify_reset_code(email, code)
         
@@ -321,15 +417,10 @@ def reset_password():
     try:
         data = request.get_json()
         
-        required_fields = ['email', 'code', 'new_password']
-        for field in required_fields:
-            if field not in data or not data[field]:
-                return jsonify({
-                    'success': False,
-                    'message': f'{field.replace("_", " ").capitalize()} is required'
-                }), 400
-        
-        email = data['email'].strip().lower()
+        if (missing := _missing_field(data, _RESET_PASSWORD_FIELDS)):
+            return jsonify(_missing_field_payload(missing)), 400
+
+        email = _norm_email(data['email'])
         code = data['code'].strip()
         new_password = data['new_password']
         
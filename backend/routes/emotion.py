@@ -1,21 +1,140 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from werkzeug.utils import secure_filename
+from concurrent.futures import ThreadPoolExecutor
+import logging
 import os
-import uuid
-from utils.image_processor import ImageProcessor
-from utils.emotion_detector import EmotionDetector
+import queue
+import threading
+import time
+import numpy as np
 from config import Config
 
+# Parsing the multi-MB live-frame body straight from bytes skips
+# Werkzeug's charset negotiation and one copy of the base64 string
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 emotion_bp = Blueprint('emotion', __name__, url_prefix='/api/emotion')
 
-# Initialize processors
-image_processor = ImageProcessor()
-emotion_detector = EmotionDetector()
+# Buffered stderr via logging instead of per-error print() - avoids
+# serializing workers on unbuffered writes during error bursts
+logger = logging.getLogger(__name__)
+
+# OpenCV decode and face detection run in C with the GIL released, so
+# threads scale across cores here without the pickling cost a process
+# pool would add per image
+_io_pool = ThreadPoolExecutor(max_workers=os.cpu_count() or 4,
+                              thread_name_prefix='emotion-io')
+
+def _preprocess_filestorage(file):
+    """Run the in-memory face pipeline on one upload (worker-thread helper)"""
+    return get_image_processor().process_filestorage(file)
+
+# Processors are created on first use so importing this module does not
+# pull TensorFlow/OpenCV into every worker at startup. Double-checked
+# locking keeps a burst of first requests (the io pool races these
+# getters from every thread) from constructing duplicates - losing that
+# race on the detector means loading the model twice.
+_image_processor = None
+_emotion_detector = None
+_processor_lock = threading.Lock()
+
+def get_image_processor():
+    """Get the shared ImageProcessor, creating it on first use"""
+    global _image_processor
+    if _image_processor is None:
+        with _processor_lock:
+            if _image_processor is None:
+                from utils.image_processor import ImageProcessor
+                _image_processor = ImageProcessor()
+    return _image_processor
+
+def get_emotion_detector():
+    """Get the shared EmotionDetector, loading the model on first use"""
+    global _emotion_detector
+    if _emotion_detector is None:
+        with _processor_lock:
+            if _emotion_detector is None:
+                from utils.emotion_detector import EmotionDetector
+                _emotion_detector = EmotionDetector()
+    return _emotion_detector
+
+# Live-frame inference runs on one dedicated thread that drains whatever
+# frames arrived within a short window into a single model call, so
+# concurrent webcam streams share batches instead of serializing on the
+# model one frame at a time
+_INFER_BATCH_MAX = 8
+_INFER_WINDOW = 0.02  # seconds to wait for more frames after the first
+_INFER_TIMEOUT = 2.0  # seconds a request waits for its prediction
+_infer_queue = queue.Queue()
+_infer_thread = None
+_infer_thread_lock = threading.Lock()
+
+def _infer_worker():
+    """Drain the frame queue in small batches and fan predictions back out"""
+    detector = get_emotion_detector()
+
+    while True:
+        batch = [_infer_queue.get()]
+        deadline = time.monotonic() + _INFER_WINDOW
+
+        while len(batch) < _INFER_BATCH_MAX:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(_infer_queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+
+        try:
+            faces = np.vstack([face for face, _ in batch])
+            predictions = detector.batch_predict(faces)
+        except Exception:
+            logger.exception("Error in live inference worker")
+            predictions = []
+
+        for i, (_, reply) in enumerate(batch):
+            reply.put(predictions[i] if i < len(predictions) else None)
+
+def _predict_live(preprocessed_face):
+    """Queue one preprocessed face for the inference worker and wait"""
+    global _infer_thread
+
+    if _infer_thread is None:
+        with _infer_thread_lock:
+            if _infer_thread is None:
+                _infer_thread = threading.Thread(
+                    target=_infer_worker, name='emotion-infer', daemon=True)
+                _infer_thread.start()
+
+    reply = queue.Queue(maxsize=1)
+    _infer_queue.put((preprocessed_face, reply))
+
+    try:
+        return reply.get(timeout=_INFER_TIMEOUT)
+    except queue.Empty:
+        return None
+
+# Key tuples for the detection response dicts - dict.fromkeys over a
+# fixed tuple pre-shapes the hash table in one C call instead of a
+# PyDict_SetItem per literal key
+_UPLOAD_RESPONSE_KEYS = ('success', 'emotion', 'confidence', 'emoji',
+                         'all_predictions', 'face_detected', 'message')
+_LIVE_RESPONSE_KEYS = ('success', 'emotion', 'confidence', 'emoji',
+                       'all_predictions', 'face_detected', 'face_coordinates')
+
+# Frozen at import so the per-file check is a slice plus one set probe,
+# with no method dispatch into ImageProcessor
+_ALLOWED_EXTENSIONS = frozenset(ext.lower() for ext in Config.ALLOWED_EXTENSIONS)
+_INVALID_TYPE_MESSAGE = f'Invalid file type. Allowed types: {", ".join(Config.ALLOWED_EXTENSIONS)}'
 
 def allowed_file(filename):
     """Check if file extension is allowed"""
-    return image_processor.validate_file_extension(filename)
+    i = filename.rfind('.')
+    return i >= 0 and filename[i + 1:].lower() in _ALLOWED_EXTENSIONS
 
 @emotion_bp.route('/detect-upload', methods=['POST'])
 @jwt_required()
@@ -27,7 +146,15 @@ def detect_emotion_upload():
     """
     try:
         current_user_id = get_jwt_identity()
-        
+
+        # Reject oversized bodies from the Content-Length header before
+        # any of the multipart data is read
+        if request.content_length and request.content_length > Config.MAX_CONTENT_LENGTH:
+            return jsonify({
+                'success': False,
+                'message': 'Uploaded data exceeds the size limit'
+            }), 413
+
         # Check if file is present
         if 'image' not in request.files:
             return jsonify({
@@ -48,58 +175,43 @@ def detect_emotion_upload():
         if not allowed_file(file.filename):
             return jsonify({
                 'success': False,
-                'message': f'Invalid file type. Allowed types: {", ".join(Config.ALLOWED_EXTENSIONS)}'
+                'message': _INVALID_TYPE_MESSAGE
             }), 400
         
-        # Generate unique filename
-        filename = secure_filename(file.filename)
-        unique_filename = f"{uuid.uuid4()}_{filename}"
-        filepath = os.path.join(Config.UPLOAD_FOLDER, unique_filename)
-        
-        # Save file temporarily
-        file.save(filepath)
-        
-        try:
-            # Process image
-            preprocessed_face, original_image, face_coords = image_processor.process_uploaded_file(filepath)
-            
-            if preprocessed_face is None:
-                return jsonify({
-                    'success': False,
-                    'message': 'No face detected in the image. Please upload an image with a clear face.'
-                }), 400
-            
-            # Predict emotion
-            prediction = emotion_detector.predict_emotion(preprocessed_face)
-            
-            if not prediction:
-                return jsonify({
-                    'success': False,
-                    'message': 'Failed to detect emotion'
-                }), 500
-            
-            # Get emoji for emotion
-            emoji = emotion_detector.get_emotion_emoji(prediction['emotion'])
-            
-            response_data = {
-                'success': True,
-                'emotion': prediction['emotion'],
-                'confidence': prediction['confidence'],
-                'emoji': emoji,
-                'all_predictions': prediction['all_predictions'],
-                'face_detected': True,
-                'message': f"Detected emotion: {prediction['emotion']} with {prediction['confidence']:.1%} confidence"
-            }
-            
-            return jsonify(response_data), 200
-            
-        finally:
-            # Clean up - delete temporary file
-            if os.path.exists(filepath):
-                os.remove(filepath)
-        
+        # Process the upload in memory - no temp file, no cleanup
+        preprocessed_face, original_image, face_coords = get_image_processor().process_filestorage(file)
+
+        if preprocessed_face is None:
+            return jsonify({
+                'success': False,
+                'message': 'No face detected in the image. Please upload an image with a clear face.'
+            }), 400
+
+        # Predict emotion
+        prediction = get_emotion_detector().predict_emotion(preprocessed_face)
+
+        if not prediction:
+            return jsonify({
+                'success': False,
+                'message': 'Failed to detect emotion'
+            }), 500
+
+        # Get emoji for emotion
+        emoji = get_emotion_detector().get_emotion_emoji(prediction['emotion'])
+
+        response_data = dict.fromkeys(_UPLOAD_RESPONSE_KEYS)
+        response_data['success'] = True
+        response_data['emotion'] = prediction['emotion']
+        response_data['confidence'] = prediction['confidence']
+        response_data['emoji'] = emoji
+        response_data['all_predictions'] = prediction['all_predictions']
+        response_data['face_detected'] = True
+        response_data['message'] = f"Detected emotion: {prediction['emotion']} with {prediction['confidence']:.1%} confidence"
+
+        return jsonify(response_data), 200
+
     except Exception as e:
-        print(f"Error in detect_emotion_upload: {str(e)}")
+        logger.exception("Error in detect_emotion_upload")
         return jsonify({
             'success': False,
             'message': 'Internal server error'
@@ -118,9 +230,18 @@ def detect_emotion_live():
     """
     try:
         current_user_id = get_jwt_identity()
-        
-        data = request.get_json()
-        
+
+        if orjson is not None:
+            # cache=False so Werkzeug doesn't retain the raw body next to
+            # the parsed dict
+            raw = request.get_data(cache=False)
+            try:
+                data = orjson.loads(raw) if raw else None
+            except orjson.JSONDecodeError:
+                data = None
+        else:
+            data = request.get_json(silent=True)
+
         if not data or 'frame' not in data:
             return jsonify({
                 'success': False,
@@ -129,8 +250,10 @@ def detect_emotion_live():
         
         base64_frame = data['frame']
         
-        # Process base64 frame
-        preprocessed_face, original_frame, face_coords = image_processor.process_base64_frame(base64_frame)
+        # Process base64 frame; the user id keys a per-stream face
+        # tracker so only every tenth frame pays for full detection
+        preprocessed_face, original_frame, face_coords = get_image_processor().process_base64_frame(
+            base64_frame, track_key=current_user_id)
         
         if preprocessed_face is None:
             return jsonify({
@@ -138,10 +261,10 @@ def detect_emotion_live():
                 'message': 'No face detected in frame',
                 'face_detected': False
             }), 200  # Not an error, just no face detected
-        
-        # Predict emotion
-        prediction = emotion_detector.predict_emotion(preprocessed_face)
-        
+
+        # Predict emotion (batched across concurrent streams)
+        prediction = _predict_live(preprocessed_face)
+
         if not prediction:
             return jsonify({
                 'success': False,
@@ -149,55 +272,71 @@ def detect_emotion_live():
             }), 500
         
         # Get emoji for emotion
-        emoji = emotion_detector.get_emotion_emoji(prediction['emotion'])
-        
-        response_data = {
-            'success': True,
-            'emotion': prediction['emotion'],
-            'confidence': prediction['confidence'],
-            'emoji': emoji,
-            'all_predictions': prediction['all_predictions'],
-            'face_detected': True,
-            'face_coordinates': {
-                'x': int(face_coords[0]),
-                'y': int(face_coords[1]),
-                'width': int(face_coords[2]),
-                'height': int(face_coords[3])
-            } if face_coords is not None else None
-        }
-        
+        emoji = get_emotion_detector().get_emotion_emoji(prediction['emotion'])
+        
+        response_data = dict.fromkeys(_LIVE_RESPONSE_KEYS)
+        response_data['success'] = True
+        response_data['emotion'] = prediction['emotion']
+        response_data['confidence'] = prediction['confidence']
+        response_data['emoji'] = emoji
+        response_data['all_predictions'] = prediction['all_predictions']
+        response_data['face_detected'] = True
+        response_data['face_coordinates'] = {
+            'x': int(face_coords[0]),
+            'y': int(face_coords[1]),
+            'width': int(face_coords[2]),
+            'height': int(face_coords[3])
+        } if face_coords is not None else None
+
         return jsonify(response_data), 200
         
     except Exception as e:
-        print(f"Error in detect_emotion_live: {str(e)}")
+        logger.exception("Error in detect_emotion_live")
         return jsonify({
             'success': False,
             'message': 'Internal server error'
         }), 500
 
+# Model metadata and the service self-test are effectively static, so
+# their payloads are cached in-module (same shape as the health cache:
+# a (expires_at, payload) pair; a lost race just rebuilds the payload)
+_MODEL_INFO_TTL = 3600.0
+_model_info_cache = None
+_TEST_TTL = 60.0
+_test_cache = None
+
 @emotion_bp.route('/model-info', methods=['GET'])
 def get_model_info():
     """
     Get information about the emotion detection model
     No authentication required
     """
+    global _model_info_cache
     try:
-        model_info = emotion_detector.get_model_info()
-        
+        now = time.monotonic()
+        cached = _model_info_cache
+        if cached is not None and cached[0] > now:
+            return jsonify(cached[1]), 200
+
+        model_info = get_emotion_detector().get_model_info()
+
         if not model_info:
             return jsonify({
                 'success': False,
                 'message': 'Model information not available'
             }), 500
-        
-        return jsonify({
+
+        payload = {
             'success': True,
             'model_info': model_info,
-            'emotion_emojis': Config.EMOTION_EMOJIS
-        }), 200
-        
+            'emotion_emojis': dict(Config.EMOTION_EMOJIS)
+        }
+        _model_info_cache = (now + _MODEL_INFO_TTL, payload)
+
+        return jsonify(payload), 200
+
     except Exception as e:
-        print(f"Error in get_model_info: {str(e)}")
+        logger.exception("Error in get_model_info")
         return jsonify({
             'success': False,
             'message': 'Internal server error'
@@ -213,7 +352,14 @@ def batch_detect_emotions():
     """
     try:
         current_user_id = get_jwt_identity()
-        
+
+        # Reject oversized bodies before reading any of the parts
+        if request.content_length and request.content_length > Config.MAX_CONTENT_LENGTH:
+            return jsonify({
+                'success': False,
+                'message': 'Uploaded data exceeds the size limit'
+            }), 413
+
         # Check if files are present
         if 'images' not in request.files:
             return jsonify({
@@ -238,11 +384,14 @@ def batch_detect_emotions():
             }), 400
         
         results = []
-        
+        valid = []    # (index into results, file)
+        pending = []  # (index into results, original filename, face)
+
+        # Validate the whole batch before spending any decode work
         for file in files:
             if file.filename == '':
                 continue
-            
+
             if not allowed_file(file.filename):
                 results.append({
                     'filename': file.filename,
@@ -250,53 +399,52 @@ def batch_detect_emotions():
                     'message': 'Invalid file type'
                 })
                 continue
-            
-            # Generate unique filename
-            filename = secure_filename(file.filename)
-            unique_filename = f"{uuid.uuid4()}_{filename}"
-            filepath = os.path.join(Config.UPLOAD_FOLDER, unique_filename)
-            
-            try:
-                # Save file
-                file.save(filepath)
-                
-                # Process image
-                preprocessed_face, _, _ = image_processor.process_uploaded_file(filepath)
-                
-                if preprocessed_face is None:
-                    results.append({
-                        'filename': file.filename,
-                        'success': False,
-                        'message': 'No face detected'
-                    })
-                    continue
-                
-                # Predict emotion
-                prediction = emotion_detector.predict_emotion(preprocessed_face)
-                
-                if not prediction:
-                    results.append({
-                        'filename': file.filename,
-                        'success': False,
-                        'message': 'Failed to detect emotion'
-                    })
-                    continue
-                
-                emoji = emotion_detector.get_emotion_emoji(prediction['emotion'])
-                
-                results.append({
+
+            # Placeholder keeps results in upload order
+            results.append(None)
+            valid.append((len(results) - 1, file))
+
+        # Fan the decode + face-detection work out across the pool
+        jobs = [(index, file, _io_pool.submit(_preprocess_filestorage, file))
+                for index, file in valid]
+
+        # Collect the preprocessed faces as they finish
+        for index, file, future in jobs:
+            preprocessed_face, _, _ = future.result()
+
+            if preprocessed_face is None:
+                results[index] = {
                     'filename': file.filename,
+                    'success': False,
+                    'message': 'No face detected'
+                }
+                continue
+
+            pending.append((index, file.filename, preprocessed_face))
+
+        # One model call for all detected faces instead of one per image
+        if pending:
+            detector = get_emotion_detector()
+            faces = np.vstack([face for _, _, face in pending])
+            predictions = detector.batch_predict(faces)
+
+            for (index, original_name, _), prediction in zip(pending, predictions):
+                results[index] = {
+                    'filename': original_name,
                     'success': True,
                     'emotion': prediction['emotion'],
                     'confidence': prediction['confidence'],
-                    'emoji': emoji
-                })
-                
-            finally:
-                # Clean up
-                if os.path.exists(filepath):
-                    os.remove(filepath)
-        
+                    'emoji': detector.get_emotion_emoji(prediction['emotion'])
+                }
+
+            # batch_predict returns fewer results only on failure
+            for index, original_name, _ in pending[len(predictions):]:
+                results[index] = {
+                    'filename': original_name,
+                    'success': False,
+                    'message': 'Failed to detect emotion'
+                }
+
         return jsonify({
             'success': True,
             'results': results,
@@ -305,7 +453,7 @@ def batch_detect_emotions():
         }), 200
         
     except Exception as e:
-        print(f"Error in batch_detect_emotions: {str(e)}")
+        logger.exception("Error in batch_detect_emotions")
         return jsonify({
             'success': False,
             'message': 'Internal server error'
@@ -317,24 +465,33 @@ def test_emotion_detection():
     Test endpoint to verify emotion detection is working
     No authentication required
     """
+    global _test_cache
     try:
-        model_info = emotion_detector.get_model_info()
-        
-        return jsonify({
+        now = time.monotonic()
+        cached = _test_cache
+        if cached is not None and cached[0] > now:
+            return jsonify(cached[1]), 200
+
+        model_info = get_emotion_detector().get_model_info()
+
+        payload = {
             'success': True,
             'message': 'Emotion detection service is operational',
             'available_emotions': model_info['emotions'] if model_info else [],
-            'model_loaded': emotion_detector.model is not None,
+            'model_loaded': get_emotion_detector().is_loaded,
             'endpoints': {
                 'upload': '/api/emotion/detect-upload',
                 'live': '/api/emotion/detect-live',
                 'batch': '/api/emotion/batch-detect',
                 'info': '/api/emotion/model-info'
             }
-        }), 200
+        }
+        _test_cache = (now + _TEST_TTL, payload)
+
+        return jsonify(payload), 200
         
     except Exception as e:
-        print(f"Error in test_emotion_detection: {str(e)}")
+        logger.exception("Error in test_emotion_detection")
         return jsonify({
             'success': False,
             'message': 'Emotion detection service error'
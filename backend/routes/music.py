@@ -1,29 +1,105 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
+import logging
+import operator
+import threading
+import time
+import requests
 import spotipy
 from spotipy.oauth2 import SpotifyClientCredentials
 from utils.db_helper import DatabaseHelper
+from utils.jwt_cache import TTLCache
 from config import Config
 
 music_bp = Blueprint('music', __name__, url_prefix='/api/music')
 db = DatabaseHelper()
 
-# Initialize Spotify client
+# logging instead of print() keeps error bursts (Spotify 429s etc.)
+# from serializing workers on unbuffered stderr writes
+logger = logging.getLogger(__name__)
+
+# Single Spotify client shared across requests - credentials are static
+# and spotipy refreshes its own token, so rebuilding the client (and the
+# TLS session behind it) per request was pure overhead
+_spotify_client = None
+_spotify_lock = threading.Lock()
+
 def get_spotify_client():
-    """Get authenticated Spotify client"""
-    try:
-        client_credentials_manager = SpotifyClientCredentials(
-            client_id=Config.SPOTIFY_CLIENT_ID,
-            client_secret=Config.SPOTIFY_CLIENT_SECRET
-        )
-        sp = spotipy.Spotify(
-            client_credentials_manager=client_credentials_manager,
-            requests_timeout=10
-        )
-        return sp
-    except Exception as e:
-        print(f"Error creating Spotify client: {str(e)}")
-        return None
+    """Get the shared authenticated Spotify client, creating it once"""
+    global _spotify_client
+
+    if _spotify_client is not None:
+        return _spotify_client
+
+    with _spotify_lock:
+        if _spotify_client is None:
+            try:
+                client_credentials_manager = SpotifyClientCredentials(
+                    client_id=Config.SPOTIFY_CLIENT_ID,
+                    client_secret=Config.SPOTIFY_CLIENT_SECRET
+                )
+                _spotify_client = spotipy.Spotify(
+                    client_credentials_manager=client_credentials_manager,
+                    requests_session=requests.Session(),  # HTTP keep-alive
+                    requests_timeout=10
+                )
+            except Exception as e:
+                # Not cached - the next call retries
+                logger.exception("Error creating Spotify client")
+                return None
+
+    return _spotify_client
+
+# Valid emotion names, fixed at import - saves rebuilding the list on
+# every failed validation
+_EMOTION_KEYS = tuple(Config.EMOTION_GENRE_MAP)
+
+# Spotify's genre-seed list changes rarely; refresh at most once a day
+# instead of one network round-trip per /genres hit
+_GENRE_SEEDS_TTL = 86400.0
+_genre_seeds_cache = None  # (expires_at, genres list)
+_genre_seeds_lock = threading.Lock()
+
+def _get_genre_seeds(sp):
+    """Get Spotify's available genre seeds, cached for 24 hours"""
+    global _genre_seeds_cache
+
+    now = time.monotonic()
+    cached = _genre_seeds_cache
+    if cached is not None and cached[0] > now:
+        return cached[1]
+
+    with _genre_seeds_lock:
+        cached = _genre_seeds_cache
+        if cached is not None and cached[0] > now:
+            return cached[1]
+
+        genres = sp.recommendation_genre_seeds()['genres']
+        _genre_seeds_cache = (now + _GENRE_SEEDS_TTL, genres)
+        return genres
+
+# C-level field access for the artist-join hot loop
+_artist_name = operator.itemgetter('name')
+
+def _format_track(track):
+    """Build the API representation of one Spotify track object"""
+    images = track['album']['images']
+    return {
+        'id': track['id'],
+        'title': track['name'],
+        'artist': ', '.join(map(_artist_name, track['artists'])),
+        'album': track['album']['name'],
+        'album_art': images[0]['url'] if images else None,
+        'preview_url': track['preview_url'],
+        'external_url': track['external_urls']['spotify'],
+        'duration_ms': track['duration_ms'],
+        'popularity': track['popularity']
+    }
+
+# Recommendations for a fixed (emotion, language, limit) are stable for
+# minutes - a short TTL turns repeat hits into a dict lookup instead of
+# a ~200 ms Spotify round-trip and saves API quota
+_rec_cache = TTLCache(maxsize=512, ttl=300)
 
 @music_bp.route('/recommendations/<emotion>', methods=['GET'])
 @jwt_required()
@@ -44,20 +120,37 @@ def get_recommendations(emotion):
         language = request.args.get('language', 'english').lower()
         limit = min(int(request.args.get('limit', 6)), 20)
         
+        # One attribute lookup per map instead of one per use below
+        genre_map = Config.EMOTION_GENRE_MAP
+
         # Validate emotion
         emotion = emotion.lower()
-        if emotion not in Config.EMOTION_GENRE_MAP:
+        if emotion not in genre_map:
             return jsonify({
                 'success': False,
-                'message': f'Invalid emotion. Valid emotions: {list(Config.EMOTION_GENRE_MAP.keys())}'
+                'message': f'Invalid emotion. Valid emotions: {list(_EMOTION_KEYS)}'
             }), 400
-        
+
         # Get market code for language
         market = Config.LANGUAGE_MARKET_MAP.get(language, 'US')
-        
+
         # Get genres for emotion
-        genres = Config.EMOTION_GENRE_MAP[emotion]
-        
+        genres = genre_map[emotion]
+
+        # Serve repeat requests from the short-lived cache
+        cache_key = (emotion, language, limit)
+        tracks = _rec_cache.get(cache_key)
+        if tracks is not None:
+            return jsonify({
+                'success': True,
+                'emotion': emotion,
+                'language': language,
+                'market': market,
+                'tracks': tracks,
+                'total': len(tracks),
+                'genres_used': genres
+            }), 200
+
         # Get Spotify client
         sp = get_spotify_client()
         if not sp:
@@ -75,21 +168,10 @@ def get_recommendations(emotion):
                 market=market
             )
             
-            tracks = []
-            for track in recommendations['tracks']:
-                track_data = {
-                    'id': track['id'],
-                    'title': track['name'],
-                    'artist': ', '.join([artist['name'] for artist in track['artists']]),
-                    'album': track['album']['name'],
-                    'album_art': track['album']['images'][0]['url'] if track['album']['images'] else None,
-                    'preview_url': track['preview_url'],
-                    'external_url': track['external_urls']['spotify'],
-                    'duration_ms': track['duration_ms'],
-                    'popularity': track['popularity']
-                }
-                tracks.append(track_data)
-            
+            tracks = [_format_track(track) for track in recommendations['tracks']]
+
+            _rec_cache.set(cache_key, tracks)
+
             return jsonify({
                 'success': True,
                 'emotion': emotion,
@@ -101,14 +183,14 @@ def get_recommendations(emotion):
             }), 200
             
         except Exception as e:
-            print(f"Spotify API error: {str(e)}")
+            logger.exception("Spotify API error")
             return jsonify({
                 'success': False,
                 'message': 'Failed to fetch recommendations from Spotify'
             }), 500
         
     except Exception as e:
-        print(f"Error in get_recommendations: {str(e)}")
+        logger.exception("Error in get_recommendations")
         return jsonify({
             'success': False,
             'message': 'Internal server error'
@@ -175,7 +257,7 @@ def like_song():
         }), 201
         
     except Exception as e:
-        print(f"Error in like_song: {str(e)}")
+        logger.exception("Error in like_song")
         return jsonify({
             'success': False,
             'message': 'Internal server error'
@@ -205,7 +287,7 @@ def unlike_song(song_id):
         }), 200
         
     except Exception as e:
-        print(f"Error in unlike_song: {str(e)}")
+        logger.exception("Error in unlike_song")
         return jsonify({
             'success': False,
             'message': 'Internal server error'
@@ -228,17 +310,9 @@ def get_liked_songs():
         limit = request.args.get('limit', type=int)
         emotion_filter = request.args.get('emotion')
         
-        # Get liked songs
-        liked_songs = db.get_liked_songs(current_user_id, limit)
-        
-        # Filter by emotion if specified
-        if emotion_filter:
-            emotion_filter = emotion_filter.lower()
-            liked_songs = [
-                song for song in liked_songs 
-                if song.get('emotion_detected', '').lower() == emotion_filter
-            ]
-        
+        # Get liked songs (emotion filter applied in SQL)
+        liked_songs = db.get_liked_songs(current_user_id, limit, emotion_filter)
+
         return jsonify({
             'success': True,
             'liked_songs': liked_songs,
@@ -246,7 +320,7 @@ def get_liked_songs():
         }), 200
         
     except Exception as e:
-        print(f"Error in get_liked_songs: {str(e)}")
+        logger.exception("Error in get_liked_songs")
         return jsonify({
             'success': False,
             'message': 'Internal server error'
@@ -289,21 +363,9 @@ def search_tracks():
         try:
             results = sp.search(q=query, type='track', limit=limit, market=market)
             
-            tracks = []
-            for track in results['tracks']['items']:
-                track_data = {
-                    'id': track['id'],
-                    'title': track['name'],
-                    'artist': ', '.join([artist['name'] for artist in track['artists']]),
-                    'album': track['album']['name'],
-                    'album_art': track['album']['images'][0]['url'] if track['album']['images'] else None,
-                    'preview_url': track['preview_url'],
-                    'external_url': track['external_urls']['spotify'],
-                    'duration_ms': track['duration_ms'],
-                    'popularity': track['popularity']
-                }
-                tracks.append(track_data)
-            
+            tracks = [_format_track(track) for track in results['tracks']['items']]
+
+
             return jsonify({
                 'success': True,
                 'query': query,
@@ -312,14 +374,14 @@ def search_tracks():
             }), 200
             
         except Exception as e:
-            print(f"Spotify search error: {str(e)}")
+            logger.exception("Spotify search error")
             return jsonify({
                 'success': False,
                 'message': 'Failed to search tracks on Spotify'
             }), 500
         
     except Exception as e:
-        print(f"Error in search_tracks: {str(e)}")
+        logger.exception("Error in search_tracks")
         return jsonify({
             'success': False,
             'message': 'Internal server error'
@@ -349,23 +411,13 @@ def get_track_details(track_id):
             # Get audio features
             audio_features = sp.audio_features([track_id])[0]
             
-            track_data = {
-                'id': track['id'],
-                'title': track['name'],
-                'artist': ', '.join([artist['name'] for artist in track['artists']]),
-                'album': track['album']['name'],
-                'album_art': track['album']['images'][0]['url'] if track['album']['images'] else None,
-                'preview_url': track['preview_url'],
-                'external_url': track['external_urls']['spotify'],
-                'duration_ms': track['duration_ms'],
-                'popularity': track['popularity'],
-                'release_date': track['album']['release_date'],
-                'audio_features': {
-                    'danceability': audio_features['danceability'] if audio_features else None,
-                    'energy': audio_features['energy'] if audio_features else None,
-                    'valence': audio_features['valence'] if audio_features else None,
-                    'tempo': audio_features['tempo'] if audio_features else None
-                }
+            track_data = _format_track(track)
+            track_data['release_date'] = track['album']['release_date']
+            track_data['audio_features'] = {
+                'danceability': audio_features['danceability'] if audio_features else None,
+                'energy': audio_features['energy'] if audio_features else None,
+                'valence': audio_features['valence'] if audio_features else None,
+                'tempo': audio_features['tempo'] if audio_features else None
             }
             
             return jsonify({
@@ -374,14 +426,14 @@ def get_track_details(track_id):
             }), 200
             
         except Exception as e:
-            print(f"Spotify API error: {str(e)}")
+            logger.exception("Spotify API error")
             return jsonify({
                 'success': False,
                 'message': 'Failed to fetch track details from Spotify'
             }), 500
         
     except Exception as e:
-        print(f"Error in get_track_details: {str(e)}")
+        logger.exception("Error in get_track_details")
         return jsonify({
             'success': False,
             'message': 'Internal server error'
@@ -403,24 +455,25 @@ def get_available_genres():
             }), 500
         
         try:
-            # Get available genre seeds
-            genres = sp.recommendation_genre_seeds()
-            
+            # Get available genre seeds (cached for 24 hours); the payload
+            # dict is rebuilt per hit, which jsonify needs fresh anyway
+            genres = _get_genre_seeds(sp)
+
             return jsonify({
                 'success': True,
-                'genres': genres['genres'],
-                'total': len(genres['genres'])
+                'genres': genres,
+                'total': len(genres)
             }), 200
             
         except Exception as e:
-            print(f"Spotify API error: {str(e)}")
+            logger.exception("Spotify API error")
             return jsonify({
                 'success': False,
                 'message': 'Failed to fetch genres from Spotify'
             }), 500
         
     except Exception as e:
-        print(f"Error in get_available_genres: {str(e)}")
+        logger.exception("Error in get_available_genres")
         return jsonify({
             'success': False,
             'message': 'Internal server error'
@@ -444,14 +497,14 @@ def test_spotify_connection():
         
         # Try a simple API call
         try:
-            genres = sp.recommendation_genre_seeds()
-            
+            genres = _get_genre_seeds(sp)
+
             return jsonify({
                 'success': True,
                 'message': 'Spotify API connection successful',
                 'spotify_configured': True,
-                'available_genres_count': len(genres['genres']),
-                'emotion_genre_mapping': Config.EMOTION_GENRE_MAP,
+                'available_genres_count': len(genres),
+                'emotion_genre_mapping': dict(Config.EMOTION_GENRE_MAP),
                 'supported_languages': list(Config.LANGUAGE_MARKET_MAP.keys())
             }), 200
             
@@ -463,7 +516,7 @@ def test_spotify_connection():
             }), 500
         
     except Exception as e:
-        print(f"Error in test_spotify_connection: {str(e)}")
+        logger.exception("Error in test_spotify_connection")
         return jsonify({
             'success': False,
             'message': 'Internal server error'
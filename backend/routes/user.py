@@ -1,16 +1,24 @@
 from flask import Blueprint, request, jsonify, send_from_directory
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from werkzeug.utils import secure_filename
 import os
-import uuid
 from utils.db_helper import DatabaseHelper
 from utils.image_processor import ImageProcessor
+from utils.jwt_cache import TTLCache
 from config import Config
 
 user_bp = Blueprint('user', __name__, url_prefix='/api/user')
 db = DatabaseHelper()
 image_processor = ImageProcessor()
 
+# Dashboards poll the read endpoints; a short per-user payload cache
+# serves repeats without touching sqlite or rebuilding the response
+_response_cache = TTLCache(maxsize=5000, ttl=15)
+
+def _invalidate_user_responses(user_id):
+    """Drop every cached read payload for a user after a write"""
+    for endpoint in ('profile', 'statistics', 'preferences'):
+        _response_cache.pop((endpoint, user_id))
+
 @user_bp.route('/profile', methods=['GET'])
 @jwt_required()
 def get_profile():
@@ -19,19 +27,20 @@ def get_profile():
     """
     try:
         current_user_id = get_jwt_identity()
-        
-        # Get user data
-        user = db.get_user_by_id(current_user_id)
-        
+
+        cached = _response_cache.get(('profile', current_user_id))
+        if cached is not None:
+            return jsonify(cached), 200
+
+        # Get user data and statistics in one query
+        user = db.get_user_with_statistics(current_user_id)
+
         if not user:
             return jsonify({
                 'success': False,
                 'message': 'User not found'
             }), 404
-        
-        # Get user statistics
-        stats = db.get_user_statistics(current_user_id)
-        
+
         # Remove sensitive data
         user_data = {
             'id': user['id'],
@@ -40,22 +49,22 @@ def get_profile():
             'profile_picture': user['profile_picture'],
             'preferred_genres': user['preferred_genres'],
             'created_at': user['created_at'],
-            'updated_at': user['updated_at']
-        }
-        
-        # Add statistics if available
-        if stats:
-            user_data['statistics'] = {
-                'total_liked_songs': stats.get('total_liked_songs', 0),
-                'emotions_explored': stats.get('emotions_explored', 0),
-                'last_activity': stats.get('last_activity')
+            'updated_at': user['updated_at'],
+            'statistics': {
+                'total_liked_songs': user['total_liked_songs'] or 0,
+                'emotions_explored': user['emotions_explored'] or 0,
+                'last_activity': user['last_activity']
             }
+        }
         
-        return jsonify({
+        payload = {
             'success': True,
             'user': user_data
-        }), 200
-        
+        }
+        _response_cache.set(('profile', current_user_id), payload)
+
+        return jsonify(payload), 200
+
     except Exception as e:
         print(f"Error in get_profile: {str(e)}")
         return jsonify({
@@ -97,20 +106,21 @@ def edit_profile():
                 'message': 'No fields to update'
             }), 400
         
-        success = db.update_user_profile(
+        # update_user_profile returns the fresh row (RETURNING on
+        # SQLite 3.35+), so no follow-up SELECT is needed
+        updated_user = db.update_user_profile(
             user_id=current_user_id,
             name=name,
             preferred_genres=preferred_genres
         )
-        
-        if not success:
+
+        if not updated_user:
             return jsonify({
                 'success': False,
                 'message': 'Failed to update profile'
             }), 500
-        
-        # Get updated user data
-        updated_user = db.get_user_by_id(current_user_id)
+
+        _invalidate_user_responses(current_user_id)
         
         return jsonify({
             'success': True,
@@ -165,45 +175,32 @@ def upload_profile_picture():
                 'message': f'Invalid file type. Allowed types: {", ".join(Config.ALLOWED_EXTENSIONS)}'
             }), 400
         
-        # Generate unique filename
-        filename = secure_filename(file.filename)
-        file_extension = filename.rsplit('.', 1)[1].lower()
-        unique_filename = f"profile_{current_user_id}_{uuid.uuid4()}.{file_extension}"
-        
-        # Save to temporary location
-        temp_path = os.path.join(Config.UPLOAD_FOLDER, unique_filename)
-        file.save(temp_path)
-        
-        try:
-            # Process and save profile picture
-            final_filename = f"profile_{current_user_id}.jpg"
-            final_path = os.path.join(Config.PROFILE_PICTURE_FOLDER, final_filename)
-            
-            success = image_processor.process_profile_picture(temp_path, final_path)
-            
-            if not success:
-                return jsonify({
-                    'success': False,
-                    'message': 'Failed to process profile picture'
-                }), 500
-            
-            # Update database
-            db.update_user_profile(
-                user_id=current_user_id,
-                profile_picture=final_filename
-            )
-            
+        # Process straight from the upload buffer - only the final JPEG
+        # touches disk, no temp file round-trip
+        final_filename = f"profile_{current_user_id}.jpg"
+        final_path = os.path.join(Config.PROFILE_PICTURE_FOLDER, final_filename)
+
+        success = image_processor.process_profile_picture(file.stream, final_path)
+
+        if not success:
             return jsonify({
-                'success': True,
-                'message': 'Profile picture updated successfully',
-                'profile_picture': final_filename
-            }), 200
-            
-        finally:
-            # Clean up temporary file
-            if os.path.exists(temp_path):
-                os.remove(temp_path)
-        
+                'success': False,
+                'message': 'Failed to process profile picture'
+            }), 500
+
+        # Update database
+        db.update_user_profile(
+            user_id=current_user_id,
+            profile_picture=final_filename
+        )
+        _invalidate_user_responses(current_user_id)
+
+        return jsonify({
+            'success': True,
+            'message': 'Profile picture updated successfully',
+            'profile_picture': final_filename
+        }), 200
+
     except Exception as e:
         print(f"Error in upload_profile_picture: {str(e)}")
         return jsonify({
@@ -218,7 +215,22 @@ def get_profile_picture(filename):
     No authentication required (public access)
     """
     try:
-        return send_from_directory(Config.PROFILE_PICTURE_FOLDER, filename)
+        # Serve the smaller WebP companion when the client accepts it
+        webp_name = os.path.splitext(filename)[0] + '.webp'
+        has_webp = os.path.exists(os.path.join(Config.PROFILE_PICTURE_FOLDER, webp_name))
+        if has_webp and 'image/webp' in request.accept_mimetypes:
+            filename = webp_name
+
+        # Day-long client caching keeps this public endpoint off the
+        # request path for repeat page loads
+        response = send_from_directory(Config.PROFILE_PICTURE_FOLDER, filename, max_age=86400)
+
+        # The body depends on Accept whenever a WebP companion exists -
+        # shared caches must not serve one client's variant to another
+        if has_webp:
+            response.headers.add('Vary', 'Accept')
+
+        return response
     except Exception as e:
         print(f"Error serving profile picture: {str(e)}")
         # Return default avatar if file not found
@@ -262,13 +274,17 @@ def delete_account():
                 'success': False,
                 'message': 'Failed to delete account'
             }), 500
-        
+
+        _invalidate_user_responses(current_user_id)
+
         # Clean up profile picture if not default
         if user['profile_picture'] != Config.DEFAULT_PROFILE_PICTURE:
             picture_path = os.path.join(Config.PROFILE_PICTURE_FOLDER, user['profile_picture'])
-            if os.path.exists(picture_path):
+            for path in (picture_path, os.path.splitext(picture_path)[0] + '.webp'):
                 try:
-                    os.remove(picture_path)
+                    os.unlink(path)
+                except FileNotFoundError:
+                    pass
                 except Exception as e:
                     print(f"Error deleting profile picture: {str(e)}")
         
@@ -292,7 +308,11 @@ def get_statistics():
     """
     try:
         current_user_id = get_jwt_identity()
-        
+
+        cached = _response_cache.get(('statistics', current_user_id))
+        if cached is not None:
+            return jsonify(cached), 200
+
         # Get user statistics
         stats = db.get_user_statistics(current_user_id)
         
@@ -302,15 +322,9 @@ def get_statistics():
                 'message': 'Statistics not available'
             }), 404
         
-        # Get liked songs for additional insights
-        liked_songs = db.get_liked_songs(current_user_id)
-        
-        # Count songs by emotion
-        emotion_breakdown = {}
-        for song in liked_songs:
-            emotion = song.get('emotion_detected', 'unknown')
-            emotion_breakdown[emotion] = emotion_breakdown.get(emotion, 0) + 1
-        
+        # Count songs by emotion in SQL instead of materializing every row
+        emotion_breakdown = db.get_emotion_breakdown(current_user_id)
+
         # Get most liked emotion
         most_liked_emotion = max(emotion_breakdown, key=emotion_breakdown.get) if emotion_breakdown else None
         
@@ -323,11 +337,14 @@ def get_statistics():
             'account_age_days': None  # Calculate if needed
         }
         
-        return jsonify({
+        payload = {
             'success': True,
             'statistics': statistics
-        }), 200
-        
+        }
+        _response_cache.set(('statistics', current_user_id), payload)
+
+        return jsonify(payload), 200
+
     except Exception as e:
         print(f"Error in get_statistics: {str(e)}")
         return jsonify({
@@ -343,25 +360,32 @@ def get_preferences():
     """
     try:
         current_user_id = get_jwt_identity()
-        
+
+        cached = _response_cache.get(('preferences', current_user_id))
+        if cached is not None:
+            return jsonify(cached), 200
+
         user = db.get_user_by_id(current_user_id)
-        
+
         if not user:
             return jsonify({
                 'success': False,
                 'message': 'User not found'
             }), 404
-        
+
         # Parse preferred genres
         preferred_genres = user['preferred_genres'].split(',') if user['preferred_genres'] else []
         preferred_genres = [genre.strip() for genre in preferred_genres]
-        
-        return jsonify({
+
+        payload = {
             'success': True,
             'preferences': {
                 'preferred_genres': preferred_genres
             }
-        }), 200
+        }
+        _response_cache.set(('preferences', current_user_id), payload)
+
+        return jsonify(payload), 200
         
     except Exception as e:
         print(f"Error in get_preferences: {str(e)}")
@@ -409,7 +433,9 @@ def update_preferences():
                 'success': False,
                 'message': 'Failed to update preferences'
             }), 500
-        
+
+        _invalidate_user_responses(current_user_id)
+
         return jsonify({
             'success': True,
             'message': 'Preferences updated successfully',
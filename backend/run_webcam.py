@@ -1,8 +1,11 @@
+import collections
 import cv2
 import numpy as np
+import os
+import queue
+import threading
 import tensorflow as tf
 from tensorflow.keras.models import load_model
-from tensorflow.keras.utils import img_to_array
 
 
 
@@ -11,48 +14,157 @@ import json
 # Load model
 model = tf.keras.models.load_model("backend/model/best_model.keras")
 
+# model.predict() pays graph-trace lookup and tensor setup per frame,
+# which dominates on a 75x75 model. Prefer an exported ONNX engine when
+# one exists (one-time: tf2onnx.convert.from_keras -> emotion_model.onnx),
+# otherwise compile a tf.function once for the fixed input shape.
+ONNX_PATH = "backend/model/emotion_model.onnx"
+try:
+    if not os.path.exists(ONNX_PATH):
+        raise ImportError
+    import onnxruntime as ort
+
+    _opts = ort.SessionOptions()
+    _opts.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    _sess = ort.InferenceSession(
+        ONNX_PATH, _opts,
+        providers=['CUDAExecutionProvider', 'CPUExecutionProvider'])
+    _input_name = _sess.get_inputs()[0].name
+
+    def predict(batch):
+        return _sess.run(None, {_input_name: batch.astype(np.float32)})[0]
+except ImportError:
+    _predict_fn = tf.function(
+        lambda x: model(x, training=False),
+        input_signature=[tf.TensorSpec((None, 75, 75, 1), tf.float32)],
+    )
+
+    def predict(batch):
+        return _predict_fn(tf.convert_to_tensor(batch, tf.float32)).numpy()
+
 # Load class indices
 with open("backend/model/class_indices.json", "r") as f:
     class_indices = json.load(f)
 class_labels = {v:k for k,v in class_indices.items()}
 
+# Face detection: prefer OpenCV's YuNet (SIMD-optimized, several times
+# faster than the Haar cascade and more accurate) when its ONNX model
+# has been downloaded next to the emotion model; Haar otherwise
+YUNET_PATH = "backend/model/face_detection_yunet_2023mar.onnx"
+face_detector = None
+if hasattr(cv2, 'FaceDetectorYN') and os.path.exists(YUNET_PATH):
+    face_detector = cv2.FaceDetectorYN.create(
+        YUNET_PATH, '', (320, 240), score_threshold=0.7)
+
 # Load Haar Cascade for face detection
 face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
 
+def detect_faces(frame, gray_frame):
+    """Detect faces, returning (x, y, w, h) boxes clipped to the frame"""
+    if face_detector is not None:
+        fh, fw = frame.shape[:2]
+        face_detector.setInputSize((fw, fh))
+        _, dets = face_detector.detect(frame)
+        if dets is None:
+            return []
+        return [
+            (max(0, int(x)), max(0, int(y)),
+             min(int(w), fw - max(0, int(x))), min(int(h), fh - max(0, int(y))))
+            for x, y, w, h in dets[:, :4]
+        ]
+    # Haar cost scales with pixel count - detect on a half-resolution
+    # frame and scale the boxes back up for the full-res crop
+    small = cv2.resize(gray_frame, None, fx=0.5, fy=0.5,
+                       interpolation=cv2.INTER_AREA)
+    faces = face_cascade.detectMultiScale(small, scaleFactor=1.3, minNeighbors=5)
+    if len(faces) == 0:
+        return []
+    return (np.asarray(faces) * 2).astype(int)
+
 # Smoothing settings
-history = []  # store last N predictions
 N = 5         # number of frames to average
+history = collections.deque(maxlen=N)  # store last N predictions
+sum_buf = None  # running sum of history, sized on first prediction
 
-# Start webcam
+# Frame-diff gate: when a face crop barely moved since the last frame,
+# reuse its previous prediction instead of rerunning the model
+DIFF_THRESHOLD = 3.0  # mean absolute pixel delta
+last_faces = []       # (gray 75x75 crop, preds) per face, previous frame
+
+# Start webcam - pin the capture size so we never pay for oversized frames
 cap = cv2.VideoCapture(0)
+cap.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
+cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
+
+# Capture on a background thread so USB read/decode overlaps detection
+# and inference; the 1-slot queue keeps only the newest frame, so a slow
+# iteration never makes us process a stale one
+frame_queue = queue.Queue(maxsize=1)
+
+def read_frames():
+    while True:
+        ret, f = cap.read()
+        if not ret:
+            frame_queue.put(None)  # signal end of stream
+            break
+        if frame_queue.full():
+            try:
+                frame_queue.get_nowait()
+            except queue.Empty:
+                pass
+        frame_queue.put(f)
+
+threading.Thread(target=read_frames, daemon=True).start()
 
 while True:
-    ret, frame = cap.read()
-    if not ret:
+    frame = frame_queue.get()
+    if frame is None:
         break
 
     display_frame = frame.copy()
     gray_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
 
     # Detect faces
-    faces = face_cascade.detectMultiScale(gray_frame, scaleFactor=1.3, minNeighbors=5)
-
-    for (x, y, w, h) in faces:
+    faces = detect_faces(frame, gray_frame)
+
+    crops_gray = [cv2.resize(gray_frame[y:y+h, x:x+w], (75, 75))
+                  for (x, y, w, h) in faces]
+
+    # Reuse the previous prediction for faces that barely changed
+    preds_batch = [None] * len(crops_gray)
+    to_run = []
+    for i, crop in enumerate(crops_gray):
+        if i < len(last_faces):
+            prev_crop, prev_preds = last_faces[i]
+            if np.abs(prev_crop.astype(np.int16) - crop).mean() < DIFF_THRESHOLD:
+                preds_batch[i] = prev_preds
+                continue
+        to_run.append(i)
+
+    if to_run:
+        # One batched model call for every face that actually changed -
+        # same FLOPs, one launch
+        crops = np.stack([crops_gray[i] for i in to_run]
+                         ).astype(np.float32)[..., None] / 255.0
+
+        for i, preds in zip(to_run, predict(crops)):
+            preds_batch[i] = preds
+
+    last_faces = list(zip(crops_gray, preds_batch))
+
+    for (x, y, w, h), preds in zip(faces, preds_batch):
         # Draw rectangle around face
         cv2.rectangle(display_frame, (x, y), (x+w, y+h), (255, 0, 0), 2)
 
-        # Extract face region and resize
-        face_img = gray_frame[y:y+h, x:x+w]
-        face_img = cv2.resize(face_img, (75,75))
-        img_array = img_to_array(face_img)/255.0
-        img_array = np.expand_dims(img_array, axis=0)
-
-        # Predict
-        preds = model.predict(img_array)[0]
+        # Running sum instead of np.mean over the stacked history -
+        # no per-frame reallocation
+        if sum_buf is None:
+            sum_buf = np.zeros_like(preds, dtype=np.float32)
+        if len(history) == N:
+            sum_buf -= history[0]
         history.append(preds)
-        if len(history) > N:
-            history.pop(0)
-        smoothed = np.mean(history, axis=0)
+        sum_buf += preds
+        smoothed = sum_buf / len(history)
 
         # Get dominant emotion
         top_idx = np.argmax(smoothed)
@@ -1,45 +1,223 @@
 import sqlite3
 import os
 import bcrypt
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-import random
-import string
+import hashlib
+import hmac
+import secrets
 from config import Config
 
+# UPDATE ... RETURNING needs SQLite 3.35+
+_HAS_RETURNING = sqlite3.sqlite_version_info >= (3, 35, 0)
+
+# Stamped into PRAGMA user_version after schema.sql runs; bump whenever
+# schema.sql changes so existing databases re-apply it
+_SCHEMA_VERSION = 2
+
+# Prefer argon2id (SIMD-accelerated C extension, tuned for ~50ms) over
+# bcrypt for new hashes; existing bcrypt hashes keep verifying
+try:
+    from argon2 import PasswordHasher
+    from argon2.exceptions import VerificationError, InvalidHashError
+    _argon2_hasher = PasswordHasher(time_cost=2, memory_cost=19456, parallelism=1)
+except ImportError:
+    _argon2_hasher = None
+
+# Both KDFs release the GIL inside their C extensions, so running them
+# on a dedicated pool keeps 50-200ms hashes from pinning request threads
+_kdf_pool = ThreadPoolExecutor(max_workers=os.cpu_count() or 2,
+                               thread_name_prefix='kdf')
+
+def _hash_password(password):
+    """Hash a password on the KDF pool"""
+    if _argon2_hasher is not None:
+        return _kdf_pool.submit(_argon2_hasher.hash, password).result()
+
+    future = _kdf_pool.submit(bcrypt.hashpw, password.encode('utf-8'), bcrypt.gensalt())
+    return future.result().decode('utf-8')
+
+def _verify_argon2(password, password_hash):
+    """Verify an argon2 hash, returning False instead of raising"""
+    try:
+        return _argon2_hasher.verify(password_hash, password)
+    except (VerificationError, InvalidHashError):
+        return False
+
+# Short-lived verifier cache: a client that reconnects several times a
+# minute pays the full KDF once, then matches a keyed HMAC of the
+# password (constant-time compare) for the rest of the window. Storage
+# is untouched - the KDF still runs cold and on any miss.
+_VERIFIER_TTL = 30.0
+_verifier_cache = {}  # user_id -> (expires_at, hmac digest)
+_verifier_lock = threading.Lock()
+
+def _password_verifier(password):
+    """Keyed HMAC of a plaintext password for the burst cache"""
+    return hmac.new(Config.SECRET_KEY.encode('utf-8'),
+                    password.encode('utf-8'), hashlib.sha256).digest()
+
+def _verifier_cache_check(user_id, password):
+    """True when a cached verifier matches within its window"""
+    with _verifier_lock:
+        entry = _verifier_cache.get(user_id)
+        if entry is None:
+            return False
+        expires_at, digest = entry
+        if time.monotonic() >= expires_at:
+            del _verifier_cache[user_id]
+            return False
+    return hmac.compare_digest(digest, _password_verifier(password))
+
+def _verifier_cache_store(user_id, password):
+    """Remember a successful verification for a short window"""
+    with _verifier_lock:
+        if len(_verifier_cache) > 10000:
+            _verifier_cache.clear()
+        _verifier_cache[user_id] = (time.monotonic() + _VERIFIER_TTL,
+                                    _password_verifier(password))
+
+def _verifier_cache_evict(user_id):
+    """Drop a cached verifier (on password change/reset)"""
+    with _verifier_lock:
+        _verifier_cache.pop(user_id, None)
+
+def _check_password(password, password_hash):
+    """Verify a password against its hash on the KDF pool"""
+    # Dispatch on the stored hash format so legacy bcrypt users still log in
+    if password_hash.startswith('$argon2'):
+        if _argon2_hasher is None:
+            print("Error: argon2 hash stored but argon2-cffi is not installed")
+            return False
+        return _kdf_pool.submit(_verify_argon2, password, password_hash).result()
+
+    future = _kdf_pool.submit(bcrypt.checkpw, password.encode('utf-8'),
+                              password_hash.encode('utf-8'))
+    return future.result()
+
+# Short-TTL cache for hot user lookups - keyed by ('id', user_id) or
+# ('email', email), shared across DatabaseHelper instances
+_user_cache = {}
+_user_cache_lock = threading.Lock()
+_USER_CACHE_TTL = 60
+_USER_CACHE_MAXSIZE = 5000
+
+def _user_cache_get(key):
+    """Return cached user dict or None if absent/expired"""
+    with _user_cache_lock:
+        entry = _user_cache.get(key)
+
+        if entry is None:
+            return None
+
+        expires_at, user = entry
+        if time.monotonic() >= expires_at:
+            del _user_cache[key]
+            return None
+
+        return user
+
+def _user_cache_put(key, user):
+    """Cache a user dict under the given key"""
+    with _user_cache_lock:
+        while len(_user_cache) >= _USER_CACHE_MAXSIZE:
+            _user_cache.pop(next(iter(_user_cache)))
+
+        _user_cache[key] = (time.monotonic() + _USER_CACHE_TTL, user)
+
+def _user_cache_invalidate(user_id=None, email=None):
+    """Drop cached entries for a user after a write"""
+    with _user_cache_lock:
+        if user_id is not None:
+            entry = _user_cache.pop(('id', user_id), None)
+            if entry is not None and email is None:
+                email = entry[1].get('email')
+
+        if email is not None:
+            _user_cache.pop(('email', email), None)
+
+# One connection per thread and database file - SQLite connections are
+# not safe to share across threads, but reopening per call pays the
+# file-open and PRAGMA cost on every request
+_connections = threading.local()
+
 class DatabaseHelper:
     """Handles all database operations for EmoTune"""
-    
+
     def __init__(self, db_path=None):
         if db_path is None:
             # Extract path from DATABASE_URL (remove 'sqlite:///')
             db_path = Config.DATABASE_URL.replace('sqlite:///', '')
-            
+
         self.db_path = db_path
         self.init_database()
-    
+
     def get_connection(self):
-        """Get database connection"""
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row  # Return rows as dictionaries
+        """Get the thread-local database connection, opening it if needed"""
+        pool = getattr(_connections, 'pool', None)
+        if pool is None:
+            pool = _connections.pool = {}
+
+        conn = pool.get(self.db_path)
+        if conn is None:
+            # A generous statement cache means the repeated hot queries
+            # (get_user_by_id, is_song_liked, ...) parse once per thread
+            conn = sqlite3.connect(self.db_path, cached_statements=256)
+            conn.row_factory = sqlite3.Row  # Return rows as dictionaries
+
+            # Set once per connection instead of per request
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute('PRAGMA temp_store=MEMORY')
+            conn.execute('PRAGMA cache_size=-20000')  # ~20 MB page cache
+            conn.execute('PRAGMA foreign_keys=ON')
+
+            pool[self.db_path] = conn
+
         return conn
+
+    def close_connection(self):
+        """Close this thread's connection (e.g. on worker shutdown)"""
+        pool = getattr(_connections, 'pool', None)
+        if pool:
+            conn = pool.pop(self.db_path, None)
+            if conn is not None:
+                conn.close()
+
+    def ping(self):
+        """Check the database is reachable without reopening it"""
+        try:
+            self.get_connection().execute('SELECT 1')
+            return True
+        except Exception as e:
+            print(f"Error pinging database: {str(e)}")
+            return False
     
     def init_database(self):
         """Initialize database with schema"""
         try:
+            conn = self.get_connection()
+
+            # Skip the schema read and the dozens of IF NOT EXISTS parses
+            # when this schema version is already stamped on the database
+            if conn.execute('PRAGMA user_version').fetchone()[0] >= _SCHEMA_VERSION:
+                return
+
             # Read schema file
             schema_path = os.path.join(os.path.dirname(__file__), '..', 'database', 'schema.sql')
-            
+
             with open(schema_path, 'r') as f:
                 schema = f.read()
-            
+
             # Execute schema
-            conn = self.get_connection()
             conn.executescript(schema)
+            conn.execute(f'PRAGMA user_version = {_SCHEMA_VERSION}')
             conn.commit()
-            conn.close()
-            
+
             print("✅ Database initialized successfully")
-            
+
         except Exception as e:
             print(f"❌ Error initializing database: {str(e)}")
             raise
@@ -61,8 +239,8 @@ class DatabaseHelper:
         """
         try:
             # Hash password
-            password_hash = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
-            
+            password_hash = _hash_password(password)
+
             conn = self.get_connection()
             cursor = conn.cursor()
             
@@ -73,8 +251,9 @@ class DatabaseHelper:
             
             user_id = cursor.lastrowid
             conn.commit()
-            conn.close()
-            
+
+            _user_cache_invalidate(user_id=user_id, email=email)
+
             return user_id
             
         except sqlite3.IntegrityError:
@@ -85,35 +264,51 @@ class DatabaseHelper:
             return None
     
     def get_user_by_email(self, email):
-        """Get user by email"""
+        """Get user by email (cached for a short TTL)"""
+        cached = _user_cache_get(('email', email))
+        if cached is not None:
+            return cached
+
         try:
             conn = self.get_connection()
             cursor = conn.cursor()
-            
+
             cursor.execute('SELECT * FROM users WHERE email = ?', (email,))
             user = cursor.fetchone()
-            
-            conn.close()
-            
-            return dict(user) if user else None
-            
+
+            if user is None:
+                return None
+
+            user = dict(user)
+            _user_cache_put(('email', email), user)
+
+            return user
+
         except Exception as e:
             print(f"Error getting user: {str(e)}")
             return None
-    
+
     def get_user_by_id(self, user_id):
-        """Get user by ID"""
+        """Get user by ID (cached for a short TTL)"""
+        cached = _user_cache_get(('id', user_id))
+        if cached is not None:
+            return cached
+
         try:
             conn = self.get_connection()
             cursor = conn.cursor()
-            
+
             cursor.execute('SELECT * FROM users WHERE id = ?', (user_id,))
             user = cursor.fetchone()
-            
-            conn.close()
-            
-            return dict(user) if user else None
-            
+
+            if user is None:
+                return None
+
+            user = dict(user)
+            _user_cache_put(('id', user_id), user)
+
+            return user
+
         except Exception as e:
             print(f"Error getting user: {str(e)}")
             return None
@@ -130,14 +325,19 @@ class DatabaseHelper:
         if not user:
             return None
         
+        # Burst path: a recent successful login short-circuits the KDF
+        if _verifier_cache_check(user['id'], password):
+            return user
+
         # Check password
-        if bcrypt.checkpw(password.encode('utf-8'), user['password_hash'].encode('utf-8')):
+        if _check_password(password, user['password_hash']):
+            _verifier_cache_store(user['id'], password)
             return user
-        
+
         return None
     
     def update_user_profile(self, user_id, name=None, preferred_genres=None, profile_picture=None):
-        """Update user profile"""
+        """Update user profile and return the updated row"""
         try:
             conn = self.get_connection()
             cursor = conn.cursor()
@@ -159,20 +359,37 @@ class DatabaseHelper:
             
             if not updates:
                 return False
-            
+
+            # Set updated_at in the statement itself: RETURNING captures
+            # the row before the AFTER UPDATE trigger rewrites it, so the
+            # trigger's timestamp would never appear in the returned row
+            updates.append('updated_at = CURRENT_TIMESTAMP')
+
             params.append(user_id)
-            
+
+            if _HAS_RETURNING:
+                # One statement returns the fresh row - no follow-up SELECT
+                query = f"UPDATE users SET {', '.join(updates)} WHERE id = ? RETURNING *"
+                cursor.execute(query, params)
+                row = cursor.fetchone()
+                conn.commit()
+
+                _user_cache_invalidate(user_id=user_id)
+
+                return dict(row) if row else None
+
             query = f"UPDATE users SET {', '.join(updates)} WHERE id = ?"
             cursor.execute(query, params)
-            
+
             conn.commit()
-            conn.close()
-            
-            return True
-            
+
+            _user_cache_invalidate(user_id=user_id)
+
+            return self.get_user_by_id(user_id)
+
         except Exception as e:
             print(f"Error updating user profile: {str(e)}")
-            return False
+            return None
     
     def delete_user(self, user_id):
         """Delete user account"""
@@ -181,10 +398,11 @@ class DatabaseHelper:
             cursor = conn.cursor()
             
             cursor.execute('DELETE FROM users WHERE id = ?', (user_id,))
-            
+
             conn.commit()
-            conn.close()
-            
+
+            _user_cache_invalidate(user_id=user_id)
+
             return True
             
         except Exception as e:
@@ -211,7 +429,6 @@ class DatabaseHelper:
             
             song_id = cursor.lastrowid
             conn.commit()
-            conn.close()
             
             return song_id
             
@@ -231,7 +448,6 @@ class DatabaseHelper:
             ''', (song_id, user_id))
             
             conn.commit()
-            conn.close()
             
             return True
             
@@ -239,22 +455,29 @@ class DatabaseHelper:
             print(f"Error removing liked song: {str(e)}")
             return False
     
-    def get_liked_songs(self, user_id, limit=None):
-        """Get all liked songs for a user"""
+    def get_liked_songs(self, user_id, limit=None, emotion=None):
+        """Get liked songs for a user, optionally filtered by emotion"""
         try:
             conn = self.get_connection()
             cursor = conn.cursor()
-            
-            query = 'SELECT * FROM liked_songs WHERE user_id = ? ORDER BY liked_at DESC'
-            
+
+            query = 'SELECT * FROM liked_songs WHERE user_id = ?'
+            params = [user_id]
+
+            if emotion:
+                # Filter in SQL instead of fetching every row into Python
+                query += ' AND LOWER(emotion_detected) = ?'
+                params.append(emotion.lower())
+
+            query += ' ORDER BY liked_at DESC'
+
             if limit:
                 query += f' LIMIT {limit}'
-            
-            cursor.execute(query, (user_id,))
+
+            cursor.execute(query, params)
             songs = cursor.fetchall()
-            
-            conn.close()
-            
+
+
             return [dict(song) for song in songs]
             
         except Exception as e:
@@ -273,7 +496,6 @@ class DatabaseHelper:
             ''', (user_id, spotify_track_id))
             
             result = cursor.fetchone()
-            conn.close()
             
             return result is not None
             
@@ -285,68 +507,76 @@ class DatabaseHelper:
     
     def generate_reset_code(self):
         """Generate a random 6-digit reset code"""
-        return ''.join(random.choices(string.digits, k=Config.RESET_CODE_LENGTH))
-    
+        # One urandom read + one format, cryptographically strong
+        return f"{secrets.randbelow(10 ** Config.RESET_CODE_LENGTH):0{Config.RESET_CODE_LENGTH}d}"
+
+    def _reset_code_digest(self, code):
+        """HMAC-SHA256 digest of a reset code (codes are never stored raw)"""
+        return hmac.new(Config.SECRET_KEY.encode('utf-8'),
+                        code.encode('utf-8'), hashlib.sha256).hexdigest()
+
     def create_reset_code(self, user_id):
         """Create a password reset code for user"""
         try:
             code = self.generate_reset_code()
             expires_at = datetime.now() + Config.RESET_CODE_EXPIRY
-            
+
             conn = self.get_connection()
-            cursor = conn.cursor()
-            
-            # Invalidate any existing codes for this user
-            cursor.execute('''
-                UPDATE password_reset_codes 
-                SET is_used = 1 
-                WHERE user_id = ? AND is_used = 0
-            ''', (user_id,))
-            
-            # Create new code
-            cursor.execute('''
-                INSERT INTO password_reset_codes 
-                (user_id, reset_code, expires_at)
-                VALUES (?, ?, ?)
-            ''', (user_id, code, expires_at))
-            
-            conn.commit()
-            conn.close()
-            
+
+            # One transaction for the invalidate + insert pair - a single
+            # COMMIT/fsync instead of two
+            with conn:
+                # Invalidate any existing codes for this user
+                conn.execute('''
+                    UPDATE password_reset_codes
+                    SET is_used = 1
+                    WHERE user_id = ? AND is_used = 0
+                ''', (user_id,))
+
+                # Create new code (digest only - a DB leak never exposes codes)
+                conn.execute('''
+                    INSERT INTO password_reset_codes
+                    (user_id, reset_code, expires_at)
+                    VALUES (?, ?, ?)
+                ''', (user_id, self._reset_code_digest(code), expires_at))
+
             return code
-            
+
         except Exception as e:
             print(f"Error creating reset code: {str(e)}")
             return None
-    
+
     def verify_reset_code(self, email, code):
         """Verify password reset code"""
         try:
             user = self.get_user_by_email(email)
             if not user:
                 return False
-            
+
             conn = self.get_connection()
             cursor = conn.cursor()
-            
+
             cursor.execute('''
-                SELECT * FROM password_reset_codes 
-                WHERE user_id = ? AND reset_code = ? AND is_used = 0
-            ''', (user['id'], code))
-            
-            reset_record = cursor.fetchone()
-            conn.close()
-            
-            if not reset_record:
-                return False
-            
-            # Check if expired
-            expires_at = datetime.fromisoformat(reset_record['expires_at'])
-            if datetime.now() > expires_at:
-                return False
-            
-            return True
-            
+                SELECT * FROM password_reset_codes
+                WHERE user_id = ? AND is_used = 0
+            ''', (user['id'],))
+
+            code_digest = self._reset_code_digest(code)
+
+            # Constant-time compare against every active code for the user
+            for reset_record in cursor.fetchall():
+                if not hmac.compare_digest(reset_record['reset_code'], code_digest):
+                    continue
+
+                # Check if expired
+                expires_at = datetime.fromisoformat(reset_record['expires_at'])
+                if datetime.now() > expires_at:
+                    return False
+
+                return True
+
+            return False
+
         except Exception as e:
             print(f"Error verifying reset code: {str(e)}")
             return False
@@ -362,7 +592,7 @@ class DatabaseHelper:
                 return False
             
             # Hash new password
-            password_hash = bcrypt.hashpw(new_password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+            password_hash = _hash_password(new_password)
             
             conn = self.get_connection()
             cursor = conn.cursor()
@@ -376,14 +606,16 @@ class DatabaseHelper:
             
             # Mark code as used
             cursor.execute('''
-                UPDATE password_reset_codes 
-                SET is_used = 1 
+                UPDATE password_reset_codes
+                SET is_used = 1
                 WHERE user_id = ? AND reset_code = ?
-            ''', (user['id'], code))
-            
+            ''', (user['id'], self._reset_code_digest(code)))
+
             conn.commit()
-            conn.close()
-            
+
+            _user_cache_invalidate(user_id=user['id'], email=email)
+            _verifier_cache_evict(user['id'])
+
             return True
             
         except Exception as e:
@@ -392,6 +624,50 @@ class DatabaseHelper:
     
     # ==================== STATISTICS ====================
     
+    def get_user_with_statistics(self, user_id):
+        """Get a user row and their statistics in a single query"""
+        try:
+            conn = self.get_connection()
+            cursor = conn.cursor()
+
+            # One round-trip instead of get_user_by_id + get_user_statistics
+            cursor.execute('''
+                SELECT u.*, s.total_liked_songs, s.emotions_explored, s.last_activity
+                FROM users u
+                LEFT JOIN user_statistics s ON s.id = u.id
+                WHERE u.id = ?
+            ''', (user_id,))
+
+            row = cursor.fetchone()
+
+            return dict(row) if row else None
+
+        except Exception as e:
+            print(f"Error getting user with statistics: {str(e)}")
+            return None
+
+    def get_emotion_breakdown(self, user_id):
+        """Get liked-song counts per emotion, aggregated in SQL"""
+        try:
+            conn = self.get_connection()
+            cursor = conn.cursor()
+
+            cursor.execute('''
+                SELECT emotion_detected, COUNT(*) AS count
+                FROM liked_songs
+                WHERE user_id = ?
+                GROUP BY emotion_detected
+            ''', (user_id,))
+
+            return {
+                (row['emotion_detected'] or 'unknown'): row['count']
+                for row in cursor.fetchall()
+            }
+
+        except Exception as e:
+            print(f"Error getting emotion breakdown: {str(e)}")
+            return {}
+
     def get_user_statistics(self, user_id):
         """Get statistics for a user"""
         try:
@@ -403,7 +679,6 @@ class DatabaseHelper:
             ''', (user_id,))
             
             stats = cursor.fetchone()
-            conn.close()
             
             return dict(stats) if stats else None
             
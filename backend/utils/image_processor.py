@@ -1,22 +1,66 @@
 import cv2
 import numpy as np
-from PIL import Image
 import base64
-import io
 import os
+import threading
 from config import Config
 
+# pybase64 wraps a SIMD (AVX2/AVX-512) decoder that runs at close to
+# memcpy speed - a large win on multi-MB webcam data URLs
+try:
+    import pybase64 as _b64
+except ImportError:
+    _b64 = base64
+
+# OpenCV spawns a thread per core for each cvtColor/resize by default,
+# which oversubscribes badly when several gunicorn workers share a box.
+# Split the cores across workers so total CV threads stay ~ core count.
+cv2.setUseOptimized(True)
+cv2.setNumThreads(
+    max(1, (os.cpu_count() or 1) // max(1, int(os.environ.get('GUNICORN_WORKERS', '1'))))
+)
+
+# Drop the YuNet ONNX model here to switch the upload pipeline to it
+_YUNET_PATH = os.path.join(
+    os.path.dirname(__file__), '..', 'model', 'face_detection_yunet_2023mar.onnx')
+
+# Webcam streams re-detect every N frames; in between, a KCF tracker
+# follows the face at a fraction of the cost of a full detection pass
+_TRACK_REDETECT_EVERY = 10
+_TRACK_STATE_MAX = 64
+
 class ImageProcessor:
     """Handles all image preprocessing for emotion detection"""
-    
+
     def __init__(self):
         self.image_size = Config.IMAGE_SIZE
         self.grayscale = Config.GRAYSCALE
-        
+
         # Load Haar Cascade for face detection
         cascade_path = cv2.data.haarcascades + 'haarcascade_frontalface_default.xml'
         self.face_cascade = cv2.CascadeClassifier(cascade_path)
-        
+
+        # YuNet is a tiny CNN detector - faster than a Haar multi-scale
+        # scan and far fewer false positives on angled faces. Optional:
+        # Haar remains the fallback when the model file isn't present.
+        self.yunet = None
+        if hasattr(cv2, 'FaceDetectorYN') and os.path.exists(_YUNET_PATH):
+            try:
+                self.yunet = cv2.FaceDetectorYN.create(
+                    _YUNET_PATH, "", (320, 320), score_threshold=0.7)
+                print("✅ YuNet face detector loaded")
+            except cv2.error as e:
+                print(f"YuNet unavailable, using Haar cascade: {str(e)}")
+
+        # Scratch buffers are per-thread: the upload pool preprocesses
+        # concurrently through one shared ImageProcessor
+        self._scratch = threading.local()
+
+        # Per-stream tracker state, keyed by the caller (user id for the
+        # live endpoint) so concurrent streams never share a tracker
+        self._trackers = {}  # key -> [tracker, frames_since_detect]
+        self._tracker_lock = threading.Lock()
+
     def preprocess_for_model(self, image):
         """
         Preprocess image for model inference
@@ -33,42 +77,84 @@ class ImageProcessor:
         else:
             gray = image
             
-        # Resize to model input size
-        resized = cv2.resize(gray, self.image_size)
-        
-        # Normalize pixel values to [0, 1]
-        normalized = resized.astype('float32') / 255.0
-        
-        # Reshape for model: (1, height, width, 1)
-        preprocessed = normalized.reshape(1, *self.image_size, 1)
-        
+        # Resize into a reused per-thread uint8 buffer instead of
+        # allocating a fresh intermediate every frame
+        resized = getattr(self._scratch, 'resize_buf', None)
+        if resized is None:
+            resized = self._scratch.resize_buf = np.empty(
+                self.image_size, dtype=np.uint8)
+        cv2.resize(gray, self.image_size, dst=resized)
+
+        # Normalize into the output tensor in one pass - no separate
+        # float32 intermediate. The output itself must stay freshly
+        # allocated: batch callers hold every returned tensor until
+        # they stack them
+        preprocessed = np.empty((1, *self.image_size, 1), dtype=np.float32)
+        np.multiply(resized, np.float32(1.0 / 255.0),
+                    out=preprocessed.reshape(self.image_size), casting='unsafe')
+
         return preprocessed
     
-    def detect_faces(self, image):
+    def detect_faces(self, image, gray=None):
         """
         Detect faces in image using Haar Cascade
-        
+
         Args:
             image: numpy array (BGR or grayscale)
-            
+            gray: optional precomputed grayscale of the same image
+
         Returns:
             List of face regions [(x, y, w, h), ...]
         """
-        # Convert to grayscale if needed
-        if len(image.shape) == 3:
-            gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-        else:
-            gray = image
-            
+        # YuNet path (needs the BGR frame, not grayscale)
+        if self.yunet is not None and len(image.shape) == 3:
+            height, width = image.shape[:2]
+            self.yunet.setInputSize((width, height))
+            _, detections = self.yunet.detect(image)
+
+            if detections is None:
+                return []
+
+            boxes = detections[:, :4].astype(int)
+            boxes[:, 0] = np.clip(boxes[:, 0], 0, width - 1)
+            boxes[:, 1] = np.clip(boxes[:, 1], 0, height - 1)
+            return boxes
+
+        # Convert to grayscale unless the caller already did
+        if gray is None:
+            if len(image.shape) == 3:
+                gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+            else:
+                gray = image
+
+        # Haar cost grows with pixel count and faces are still findable
+        # at modest resolution - shrink big frames for the scan and map
+        # the boxes back afterwards
+        scale = 1.0
+        height, width = gray.shape[:2]
+        if min(height, width) > 480:
+            scale = 480.0 / min(height, width)
+            gray = cv2.resize(
+                gray, (int(width * scale), int(height * scale)),
+                interpolation=cv2.INTER_AREA
+            )
+
+        # minSize shrinks with the frame so the minimum detectable face
+        # stays 30px in original coordinates
+        min_face = max(1, int(round(30 * scale)))
+
         # Detect faces
         faces = self.face_cascade.detectMultiScale(
             gray,
             scaleFactor=1.1,
             minNeighbors=5,
-            minSize=(30, 30),
+            minSize=(min_face, min_face),
             flags=cv2.CASCADE_SCALE_IMAGE
         )
-        
+
+        if scale != 1.0 and len(faces) > 0:
+            faces = (np.asarray(faces) / scale).astype(int)
+
         return faces
     
     def extract_face_region(self, image, face_coords):
@@ -102,19 +188,21 @@ class ImageProcessor:
             
             if image is None:
                 return None, None, None
-            
-            # Detect faces
-            faces = self.detect_faces(image)
-            
+
+            # Convert once; detection and model preprocessing both work
+            # on grayscale, so there's no need to re-convert per stage
+            gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+            faces = self.detect_faces(image, gray)
+
             if len(faces) == 0:
                 return None, image, None
-            
+
             # Get largest face (assuming it's the primary subject)
             largest_face = max(faces, key=lambda face: face[2] * face[3])
-            
-            # Extract face region
-            face_region = self.extract_face_region(image, largest_face)
-            
+
+            # Extract face region from the grayscale copy
+            face_region = self.extract_face_region(gray, largest_face)
+
             # Preprocess for model
             preprocessed = self.preprocess_for_model(face_region)
             
@@ -124,52 +212,143 @@ class ImageProcessor:
             print(f"Error processing uploaded file: {str(e)}")
             return None, None, None
     
-    def process_base64_frame(self, base64_string):
+    def process_base64_frame(self, base64_string, track_key=None):
         """
         Process base64 encoded image (from webcam)
-        
+
         Args:
             base64_string: Base64 encoded image string
-            
+            track_key: optional stream identity enabling tracking between
+                full detection passes
+
         Returns:
             tuple: (preprocessed_face, original_frame, face_coords) or (None, None, None) if no face
         """
         try:
-            # Remove data URL prefix if present
-            if ',' in base64_string:
-                base64_string = base64_string.split(',')[1]
-            
-            # Decode base64
-            image_data = base64.b64decode(base64_string)
-            
+            # Strip the data URL prefix in one pass (no split list, no regex)
+            _, _, base64_string = base64_string.rpartition(',')
+
+            # Decode base64 (SIMD path when pybase64 is installed)
+            image_data = _b64.b64decode(base64_string)
+
+            return self.process_image_bytes(image_data, track_key)
+
+        except Exception as e:
+            print(f"Error processing base64 frame: {str(e)}")
+            return None, None, None
+
+    def _detect_with_tracking(self, track_key, image, gray):
+        """
+        Detect faces, reusing a per-stream tracker between full passes
+
+        Faces barely move between consecutive webcam frames, so a KCF
+        tracker follows the last detected box for up to
+        _TRACK_REDETECT_EVERY frames before the detector runs again.
+
+        Args:
+            track_key: stream identity (e.g. user id)
+            image: BGR frame
+            gray: grayscale frame
+
+        Returns:
+            List of face regions [(x, y, w, h), ...]
+        """
+        with self._tracker_lock:
+            state = self._trackers.get(track_key)
+
+        if state is not None:
+            tracker, frames_since_detect = state
+            if frames_since_detect < _TRACK_REDETECT_EVERY:
+                ok, box = tracker.update(image)
+                if ok:
+                    state[1] = frames_since_detect + 1
+                    # Tracked boxes can drift past the frame edge
+                    x, y, w, h = (int(v) for v in box)
+                    return [(max(0, x), max(0, y), w, h)]
+
+        # Full detection pass; (re)arm the tracker on the largest face
+        faces = self.detect_faces(image, gray)
+
+        if len(faces) > 0 and hasattr(cv2, 'TrackerKCF_create'):
+            largest = max(faces, key=lambda face: face[2] * face[3])
+            tracker = cv2.TrackerKCF_create()
+            tracker.init(image, tuple(int(v) for v in largest))
+            with self._tracker_lock:
+                while len(self._trackers) >= _TRACK_STATE_MAX:
+                    self._trackers.pop(next(iter(self._trackers)))
+                self._trackers[track_key] = [tracker, 0]
+        else:
+            with self._tracker_lock:
+                self._trackers.pop(track_key, None)
+
+        return faces
+
+    def process_image_bytes(self, image_data, track_key=None):
+        """
+        Process raw encoded image bytes (JPEG/PNG/...) already in memory
+
+        Args:
+            image_data: bytes of the encoded image
+            track_key: optional stream identity enabling tracking between
+                full detection passes
+
+        Returns:
+            tuple: (preprocessed_face, original_image, face_coords) or (None, None, None) if no face
+        """
+        try:
             # Convert to numpy array
             nparr = np.frombuffer(image_data, np.uint8)
             image = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-            
+
             if image is None:
                 return None, None, None
-            
-            # Detect faces
-            faces = self.detect_faces(image)
-            
+
+            # Grayscale comes straight from the decoder: libjpeg's gray
+            # path only touches the luma plane, skipping chroma
+            # upsampling and a separate full-frame cvtColor
+            gray = cv2.imdecode(nparr, cv2.IMREAD_GRAYSCALE)
+            if track_key is not None:
+                faces = self._detect_with_tracking(track_key, image, gray)
+            else:
+                faces = self.detect_faces(image, gray)
+
             if len(faces) == 0:
                 return None, image, None
-            
+
             # Get largest face
             largest_face = max(faces, key=lambda face: face[2] * face[3])
-            
-            # Extract face region
-            face_region = self.extract_face_region(image, largest_face)
-            
+
+            # Extract face region from the grayscale copy
+            face_region = self.extract_face_region(gray, largest_face)
+
             # Preprocess for model
             preprocessed = self.preprocess_for_model(face_region)
-            
+
             return preprocessed, image, largest_face
-            
+
         except Exception as e:
-            print(f"Error processing base64 frame: {str(e)}")
+            print(f"Error processing image bytes: {str(e)}")
             return None, None, None
     
+    def process_filestorage(self, file):
+        """
+        Process an uploaded werkzeug FileStorage entirely in memory
+
+        Avoids the save-to-disk / read-back round-trip of
+        process_uploaded_file for uploads that are already buffered.
+
+        Args:
+            file: FileStorage from request.files
+
+        Returns:
+            tuple: (preprocessed_face, original_image, face_coords) or (None, None, None) if no face
+        """
+        try:
+            return self.process_image_bytes(file.read())
+        except Exception as e:
+            print(f"Error processing uploaded file: {str(e)}")
+            return None, None, None
+
     def save_processed_image(self, image, output_path):
         """
         Save processed image to disk
@@ -185,23 +364,27 @@ class ImageProcessor:
             print(f"Error saving image: {str(e)}")
             return False
     
-    def draw_emotion_on_image(self, image, face_coords, emotion, confidence):
+    def draw_emotion_on_image(self, image, face_coords, emotion, confidence,
+                              inplace=False):
         """
         Draw emotion label and bounding box on image
-        
+
         Args:
             image: numpy array
             face_coords: tuple (x, y, w, h)
             emotion: string
             confidence: float
-            
+            inplace: draw on the input frame instead of a copy - use for
+                streaming where the frame is discarded after encoding
+
         Returns:
             Image with annotations
         """
         x, y, w, h = face_coords
-        
-        # Create copy to avoid modifying original
-        annotated = image.copy()
+
+        # Copying a full BGR frame just to draw a box costs a
+        # megabyte-scale memcpy; streaming callers can skip it
+        annotated = image if inplace else image.copy()
         
         # Draw rectangle around face
         cv2.rectangle(annotated, (x, y), (x+w, y+h), (0, 255, 0), 2)
@@ -250,33 +433,45 @@ class ImageProcessor:
         return '.' in filename and \
                filename.rsplit('.', 1)[1].lower() in Config.ALLOWED_EXTENSIONS
     
-    def process_profile_picture(self, file_path, output_path):
+    def process_profile_picture(self, source, output_path):
         """
         Process and resize profile picture
-        
+
         Args:
-            file_path: Path to uploaded profile picture
+            source: Path or file-like object with the uploaded picture
             output_path: Path to save processed picture
-            
+
         Returns:
             Boolean indicating success
         """
         try:
-            # Open image with PIL
-            img = Image.open(file_path)
-            
-            # Convert to RGB if necessary
-            if img.mode != 'RGB':
-                img = img.convert('RGB')
-            
-            # Resize to 300x300 (profile picture size)
-            img = img.resize((300, 300), Image.Resampling.LANCZOS)
-            
+            # Read from disk or straight from the upload buffer
+            if hasattr(source, 'read'):
+                data = source.read()
+            else:
+                with open(source, 'rb') as f:
+                    data = f.read()
+
+            # IMREAD_COLOR normalizes RGBA/grayscale inputs to BGR
+            img = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+            if img is None:
+                raise ValueError("Could not decode uploaded picture")
+
+            # Resize to 300x300 (profile picture size); OpenCV's SIMD
+            # INTER_AREA kernel downscales several times faster than
+            # PIL's LANCZOS resampler at comparable quality
+            img = cv2.resize(img, (300, 300), interpolation=cv2.INTER_AREA)
+
             # Save
-            img.save(output_path, 'JPEG', quality=90)
-            
+            cv2.imwrite(output_path, img, [cv2.IMWRITE_JPEG_QUALITY, 90])
+
+            # Companion WebP - ~30% smaller at comparable quality, served
+            # to clients whose Accept header allows it
+            root, _ = os.path.splitext(output_path)
+            cv2.imwrite(root + '.webp', img, [cv2.IMWRITE_WEBP_QUALITY, 85])
+
             return True
-            
+
         except Exception as e:
             print(f"Error processing profile picture: {str(e)}")
             return False
\ No newline at end of file
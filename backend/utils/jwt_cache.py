@@ -0,0 +1,99 @@
+import hashlib
+import threading
+import time
+
+class TTLCache:
+    """Small thread-safe TTL cache for verified JWT claims"""
+
+    def __init__(self, maxsize=10000, ttl=30):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._lock = threading.RLock()
+        self._store = {}  # key -> (expires_at, value)
+
+    def get(self, key):
+        """Get cached value if present and not expired"""
+        with self._lock:
+            entry = self._store.get(key)
+
+            if entry is None:
+                return None
+
+            expires_at, value = entry
+            if time.monotonic() >= expires_at:
+                del self._store[key]
+                return None
+
+            return value
+
+    def set(self, key, value, ttl=None):
+        """Store value with its own TTL (capped at the cache default)"""
+        if ttl is None:
+            ttl = self.ttl
+
+        if ttl <= 0:
+            return
+
+        with self._lock:
+            # Evict oldest entries when full (insertion order)
+            while len(self._store) >= self.maxsize:
+                self._store.pop(next(iter(self._store)))
+
+            self._store[key] = (time.monotonic() + ttl, value)
+
+    def pop(self, key):
+        """Remove one entry if present (for explicit invalidation)"""
+        with self._lock:
+            self._store.pop(key, None)
+
+    def clear(self):
+        """Remove all cached entries"""
+        with self._lock:
+            self._store.clear()
+
+
+def install_jwt_cache(jwt_manager, maxsize=10000, ttl=30):
+    """
+    Wrap JWTManager's token decode with a TTL cache
+
+    Repeat requests carrying the same bearer token skip signature
+    verification entirely. Only successfully verified tokens are cached,
+    and each entry expires with the token (capped at `ttl` seconds).
+
+    Args:
+        jwt_manager: Initialized JWTManager instance
+        maxsize: Maximum number of cached tokens
+        ttl: Maximum seconds to trust a cached verification
+
+    Returns:
+        The TTLCache instance (useful for tests/invalidation)
+    """
+    cache = TTLCache(maxsize=maxsize, ttl=ttl)
+    original_decode = jwt_manager._decode_jwt_from_config
+
+    def cached_decode(encoded_token, csrf_value=None, allow_expired=False):
+        # CSRF-protected and allow-expired decodes bypass the cache
+        if csrf_value is not None or allow_expired:
+            return original_decode(encoded_token, csrf_value, allow_expired)
+
+        key = hashlib.sha256(encoded_token.encode('utf-8')).digest()[:16]
+
+        claims = cache.get(key)
+        if claims is not None:
+            return claims
+
+        # Invalid tokens raise here and are never cached
+        claims = original_decode(encoded_token)
+
+        remaining = ttl
+        exp = claims.get('exp')
+        if exp is not None:
+            remaining = min(ttl, exp - time.time())
+
+        cache.set(key, claims, remaining)
+
+        return claims
+
+    jwt_manager._decode_jwt_from_config = cached_decode
+
+    return cache